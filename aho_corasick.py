@@ -0,0 +1,152 @@
+import re
+from collections import deque
+
+
+# ----------------- Aho-Corasick 多模式匹配 -----------------
+class Automaton:
+    """
+    Aho-Corasick 自动机：所有关键词编译成一棵带失败指针的字典树，
+    每条文本只需扫描一遍就能找出其中出现的全部关键词（包括相互重叠、相互包含的关键词），
+    结果与逐个执行 `keyword in text` 完全一致
+
+    逐字符地在 Python 里走自动机比 C 实现的 `in` 还慢，因此扫描时：
+      - 用所有关键词（长的在前）组成的正则在 C 层跳到下一个关键词出现的位置，
+        匹配到的是从该位置开始的最长关键词
+      - 这个关键词内部包含的其它关键词在构建时就已经算好
+      - 根据它的失败指针决定从哪里继续查找：失败指针指向的是“该关键词的最长后缀，
+        同时又是某个关键词的前缀”，只有从这里开始的关键词才可能跨出当前匹配，
+        在它之前开始的都已经包含在当前关键词内部
+
+    find_all 只关心出现了哪些词、不关心位置，因此单字关键词（“母”“妈”“她”）不进正则，
+    逐个用 `in` 判断；这些字在长文本里到处都是，留在正则里会让扫描每隔几个字就回到 Python 一次
+    """
+
+    def __init__(self, patterns=()):
+        self.goto = [{}]      # 状态转移：goto[state][char] -> state
+        self.fail = [0]       # 失败指针
+        self.output = [()]    # 到达该状态时命中的关键词（已合并失败链上的输出）
+        self.depth = [0]      # 状态对应的前缀长度
+        self.states = {}      # 关键词 -> 终止状态
+        self.built = False
+        for pattern in patterns:
+            self.add(pattern)
+        self.build()
+
+    def add(self, pattern):
+        if not pattern:
+            raise ValueError("关键词不能为空")
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+                self.depth.append(self.depth[state] + 1)
+            state = nxt
+        if pattern not in self.output[state]:
+            self.output[state] += (pattern,)
+        self.states[pattern] = state
+        self.built = False
+
+    def build(self):
+        """按广度优先顺序计算失败指针、合并输出，并预先算好每个关键词内部的匹配与续查位置"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] += tuple(p for p in self.output[self.fail[nxt]] if p not in self.output[nxt])
+                queue.append(nxt)
+
+        self.resume = {}      # 关键词 -> 匹配开始位置之后多少个字符处继续查找
+        self.inner = {}       # 关键词 -> 在续查位置之前开始的 (起始偏移, 结束偏移, 关键词)
+        self.contained = {}   # 关键词 -> 其内部出现的全部关键词
+        for pattern, state in self.states.items():
+            resume = len(pattern) - self.depth[self.fail[state]]
+            matches = list(self._walk(pattern))
+            self.resume[pattern] = resume
+            self.inner[pattern] = tuple((end - len(p), end, p) for end, p in matches if end - len(p) < resume)
+            self.contained[pattern] = frozenset(p for _, p in matches)
+
+        self.scanner = re.compile(self._trie_regex(0)) if self.states else None
+        # find_all 用：单字关键词单独判断，正则里只保留两个字及以上的关键词
+        self.singles = tuple(p for p in self.states if len(p) == 1)
+        multi = self._trie_regex(0, min_length=2)
+        self.multi_scanner = re.compile(multi) if multi is not None else None
+        self.built = True
+
+    def _trie_regex(self, state, min_length=1):
+        """
+        把字典树直接展开成正则（公共前缀只出现一次），在同一位置贪婪地匹配最长的关键词；
+        比把所有关键词用 | 平铺开来快得多，关键词越多越明显。
+        min_length: 只匹配至少这么长的关键词；子树中没有这样的关键词时返回 None
+        """
+        branches = []
+        for ch, nxt in sorted(self.goto[state].items()):
+            sub = self._trie_regex(nxt, min_length)
+            if sub is not None:
+                branches.append(re.escape(ch) + sub)
+        terminal = self.depth[state] >= min_length and \
+            any(len(p) == self.depth[state] for p in self.output[state])
+        if not branches:
+            return '' if terminal else None
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            # 到这里已经是一个完整的关键词，后面的部分可有可无
+            body = '(?:' + body + ')?'
+        return body
+
+    def _walk(self, text):
+        """标准的逐字符 Aho-Corasick 扫描，只在构建时用于关键词本身"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for pos, ch in enumerate(text, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern in output[state]:
+                yield pos, pattern
+
+    def iter_matches(self, text):
+        """按起始位置依次产出每一处命中的 (结束位置, 关键词)，结束位置为关键词最后一个字符之后的下标"""
+        if not self.built:
+            self.build()
+        if self.scanner is None:
+            return
+        search = self.scanner.search
+        m = search(text)
+        while m:
+            pattern = m.group()
+            start = m.start()
+            for _, end, p in self.inner[pattern]:
+                yield start + end, p
+            m = search(text, start + self.resume[pattern])
+
+    def find_all(self, text, stop=frozenset()):
+        """
+        返回文本中出现过的全部关键词（集合）
+        stop: 一旦命中其中任意一个关键词就停止扫描，返回到此为止找到的关键词，
+              适合“出现某些词就可以直接下结论”的场景
+        """
+        if not self.built:
+            self.build()
+        found = {p for p in self.singles if p in text}
+        if self.multi_scanner is None or (stop and not found.isdisjoint(stop)):
+            return found
+        search = self.multi_scanner.search
+        resume, contained = self.resume, self.contained
+        m = search(text)
+        while m:
+            pattern = m.group()
+            matched = contained[pattern]
+            found |= matched
+            if stop and not matched.isdisjoint(stop):
+                break
+            m = search(text, m.start() + resume[pattern])
+        return found
@@ -0,0 +1,140 @@
+import argparse
+import os
+import threading
+import time as t
+from concurrent.futures import ThreadPoolExecutor
+
+import fetcher
+from fetcher import stats
+from movie_short_review import crawl_movie_review, crawl_new_reviews
+from movie_long_review import crawl_all_longreviews, crawl_new_longreviews, positive_int
+from movie_id_resolver import resolve_many, pick_movie_id
+
+DEFAULT_WORKERS = 4
+DEFAULT_RPS = 1.0
+KIND_NAMES = {'short': '短评', 'long': '长评'}
+
+
+# ----------------- 任务清单 -----------------
+def load_manifest(path):
+    """
+    清单文件每行一部电影：`电影名` 或 `电影名,豆瓣ID`，# 开头的行为注释
+    返回 [(movie_name, movie_id 或 None)]
+    """
+    movies = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            # 电影名本身可能带逗号（如“你好，李焕英”），只按最后一个英文逗号切分
+            name, sep, movie_id = line.rpartition(',')
+            if sep and movie_id.strip().isdigit():
+                movies.append((name.strip(), int(movie_id)))
+            else:
+                movies.append((line, None))
+    return movies
+
+
+# ----------------- 进度记录 -----------------
+class BatchProgress:
+    def __init__(self, movies, kinds):
+        self.lock = threading.Lock()
+        self.total = len(movies) * len(kinds)
+        self.finished = 0
+        self.start_time = t.time()
+        self.status = {(name, kind): '等待中' for name, _ in movies for kind in kinds}
+
+    def update(self, movie_name, kind, status, finished=False):
+        with self.lock:
+            self.status[(movie_name, kind)] = status
+            if finished:
+                self.finished += 1
+            print(f"[{self.finished}/{self.total}] 《{movie_name}》{KIND_NAMES[kind]}：{status}")
+
+    def print_summary(self, kinds):
+        print("\n==================批量抓取汇总===================")
+        movie_names = list(dict.fromkeys(name for name, _ in self.status))
+        for name in movie_names:
+            parts = [f"{KIND_NAMES[kind]} {self.status[(name, kind)]}" for kind in kinds]
+            print(f"《{name}》：" + "；".join(parts))
+        print(f"总耗时 {t.time() - self.start_time:.1f} 秒")
+        print(f"网络统计：{stats.summary()}")
+
+
+# ----------------- 调度 -----------------
+def run_task(progress, movie_name, movie_id, kind, incremental, max_pages):
+    progress.update(movie_name, kind, '抓取中')
+    try:
+        if kind == 'short':
+            count = crawl_new_reviews(movie_name, movie_id) if incremental else crawl_movie_review(movie_name, movie_id)
+        elif incremental:
+            count = crawl_new_longreviews(movie_name, movie_id)
+        else:
+            count = crawl_all_longreviews(movie_name, movie_id, max_pages)
+    except Exception as e:
+        progress.update(movie_name, kind, f'失败（{e}）', finished=True)
+        return
+    progress.update(movie_name, kind, f"完成，{'新增' if incremental else '共'} {count} 条", finished=True)
+
+
+def run_batch(movies, kinds=('short', 'long'), workers=DEFAULT_WORKERS, rate=DEFAULT_RPS,
+              incremental=False, max_pages=5):
+    """
+    movies: [(movie_name, movie_id 或 None)]，没有 ID 的先按名称批量解析
+    所有电影的短评 / 长评任务分配给 workers 个线程，所有请求共享同一个全局限速预算
+    """
+    fetcher.configure_rate_limit(rate)
+    progress = BatchProgress(movies, kinds)
+
+    # 没有 ID 的电影统一批量解析（已缓存的名称不发请求）
+    lookups = resolve_many([name for name, movie_id in movies if movie_id is None], workers)
+    resolved = []
+    for movie_name, movie_id in movies:
+        if movie_id is None:
+            movie_id = pick_movie_id(movie_name, lookups[movie_name])
+            if movie_id is None:
+                for kind in kinds:
+                    progress.update(movie_name, kind, '失败（豆瓣搜索不到该电影）', finished=True)
+                continue
+            print(f"《{movie_name}》 -> {movie_id}")
+        os.makedirs(os.path.join('./data', movie_name), exist_ok=True)
+        resolved.append((movie_name, movie_id))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_task, progress, movie_name, movie_id, kind, incremental, max_pages)
+            for movie_name, movie_id in resolved for kind in kinds
+        ]
+        for future in futures:
+            future.result()
+
+    progress.print_summary(kinds)
+    return progress.status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多部电影批量抓取（无需交互）")
+    parser.add_argument("manifest", help="电影清单文件，每行 `电影名` 或 `电影名,豆瓣ID`")
+    parser.add_argument("--kinds", default="short,long", help="抓取类型，逗号分隔：short,long")
+    parser.add_argument("--workers", type=positive_int, default=DEFAULT_WORKERS, help=f"并发线程数（默认 {DEFAULT_WORKERS}）")
+    parser.add_argument("--rps", type=float, default=DEFAULT_RPS,
+                        help=f"所有任务共享的每个域名每秒请求预算（默认 {DEFAULT_RPS}）")
+    parser.add_argument("--incremental", action="store_true", help="增量模式：只抓取上次之后的新评论")
+    parser.add_argument("--max-pages", type=int, default=5, help="长评列表最多抓取多少页")
+    fetcher.add_cache_arguments(parser)
+    args = parser.parse_args()
+    fetcher.configure_from_args(args)
+
+    kinds = [k.strip() for k in args.kinds.split(',') if k.strip()]
+    for kind in kinds:
+        if kind not in KIND_NAMES:
+            parser.error(f"未知的抓取类型：{kind}")
+
+    movies = load_manifest(args.manifest)
+    print(f"清单中共 {len(movies)} 部电影，{len(movies) * len(kinds)} 个抓取任务")
+    run_batch(movies, kinds, args.workers, args.rps, args.incremental, args.max_pages)
+
+
+if __name__ == '__main__':
+    main()
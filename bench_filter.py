@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import time as t
+
+from filter import DEFAULT_THEME, ThemeMatcher, filter_mother_daughter, get_matcher
+
+DATA_ROOT = './data'
+RAW_SUBDIR = '原始评论数据'
+
+
+# ----------------- 原实现（对照组） -----------------
+def legacy_filter_mother_daughter(comments):
+    """改动前 filter_mother_daughter 的逐词 `in` 判断"""
+    # 一级关键词（直接命中母女关系，扩充隐喻/方言/场景词）
+    strong_keywords = [
+        "母女", "母子" , "母女关系", "母女情", "母女线", "母女档",
+        "母爱", "亲子关系", "母职", "妈妈们", "母亲角色",
+        "单亲妈妈", "独生女", "母女俩", "娘亲", "囡囡", "小棉袄",
+        "慈母", "贤女", "母性光辉", "抚养女儿", "养育女儿", "陪伴女儿"
+    ]
+
+    # 二级关键词（母亲相关，补充同义/方言/敬称）
+    mother_words = [
+        "妈妈", "母亲", "娘", "妈", "母" ,"老妈", "妈咪", "娘亲",
+        "她妈", "他妈", "单亲妈妈", "慈母", "母上", "母親大人",
+        "宝妈", "母性", "养母", "继母"  # 补充常见母亲相关称谓
+    ]
+
+    # 二级关键词（女儿相关，补充同义/方言/爱称）
+    daughter_words = [
+        "女儿", "闺女", "姑娘", "小姑娘", "丫头", "囡囡", "小棉袄",
+        "她女儿", "他女儿", "独生女", "贤女", "乖女儿", "囡儿",
+        "千金", "小丫头", "干女儿"  # 补充常见女儿相关称谓
+    ]
+    filtered = []
+
+    for c in comments:
+        content = c["content"]
+
+        # 1. 强匹配：只要出现这些就直接选
+        if any(k in content for k in strong_keywords):
+            filtered.append(c)
+            continue
+
+        # 2. 母 / 女任意组合匹配
+        if any(m in content for m in mother_words) and \
+                any(d in content for d in daughter_words):
+            filtered.append(c)
+            continue
+
+        # 3. “她和她妈”“她和女儿”的句型
+        if ("她" in content) and ("妈" in content):
+            filtered.append(c)
+            continue
+        if ("她" in content) and ("女儿" in content):
+            filtered.append(c)
+            continue
+
+        # 4. 亲情戏 + 女性（常见于影评，但不一定是母女）
+        if ("亲情戏" in content or "家庭线" in content) and \
+                ("母" in content or "妈" in content):
+            filtered.append(c)
+            continue
+
+    return filtered
+
+
+# ----------------- 测试数据 -----------------
+def load_reviews(filename, base_dir=DATA_ROOT):
+    """读取每部电影的 short_reviews.json / long_reviews.json，返回合并后的评论列表"""
+    comments = []
+    if not os.path.exists(base_dir):
+        return comments
+    for movie in sorted(os.listdir(base_dir)):
+        path = os.path.join(base_dir, movie, RAW_SUBDIR, filename)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                comments.extend(c for c in json.load(f) if isinstance(c.get("content"), str))
+    return comments
+
+
+def bench(func, comments, repeat):
+    start = t.perf_counter()
+    for _ in range(repeat):
+        func(comments)
+    elapsed = t.perf_counter() - start
+    return len(comments) * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="母女关系评论过滤基准测试")
+    parser.add_argument("--repeat", type=int, default=3, help="每组评论重复过滤的次数")
+    args = parser.parse_args()
+
+    for label, filename in (("短评", "short_reviews.json"), ("长评", "long_reviews.json")):
+        comments = load_reviews(filename)
+        if not comments:
+            print(f"{label}：没有找到 {filename}，请先抓取评论")
+            continue
+
+        legacy = legacy_filter_mother_daughter(comments)
+        new = filter_mother_daughter(comments)
+        same = [id(c) for c in legacy] == [id(c) for c in new]
+        chars = sum(len(c["content"]) for c in comments)
+        print(f"{label}：共 {len(comments)} 条（{chars} 字），命中 {len(new)} 条，结果{'一致' if same else '不一致'}")
+
+        matcher = get_matcher()
+        counts = {}
+        for _, matched in matcher.match_comments(comments):
+            for theme, (rule, _) in matched.items():
+                counts.setdefault(theme, {})
+                counts[theme][rule] = counts[theme].get(rule, 0) + 1
+        for theme in matcher.themes:
+            print(f"  {theme.label}：{counts.get(theme.name, {})}")
+
+        separate = [ThemeMatcher([theme]) for theme in matcher.themes]
+        legacy_speed = bench(legacy_filter_mother_daughter, comments, args.repeat)
+        new_speed = bench(filter_mother_daughter, comments, args.repeat)
+        all_speed = bench(matcher.match_comments, comments, args.repeat)
+        separate_speed = bench(lambda cs: [m.match_comments(cs) for m in separate], comments, args.repeat)
+        print(f"  原实现（仅{DEFAULT_THEME}）：{legacy_speed:.0f} 条/秒")
+        print(f"  新实现（仅{DEFAULT_THEME}）：{new_speed:.0f} 条/秒，加速比 {new_speed / legacy_speed:.2f}x")
+        print(f"  全部 {len(separate)} 个主题一次扫描：{all_speed:.0f} 条/秒")
+        print(f"  每个主题各扫描一遍：{separate_speed:.0f} 条/秒")
+
+if __name__ == '__main__':
+    main()
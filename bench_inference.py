@@ -0,0 +1,97 @@
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time as t
+
+from sentiment_inference import BACKENDS, DEFAULT_BATCH_SIZE, build_classifier, classify_texts
+
+
+# ----------------- 内存统计 -----------------
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB）；Windows 没有 resource 模块，返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 单位为字节
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# ----------------- 单个后端 -----------------
+def run_backend(backend, texts, batch_size, threads):
+    """在独立子进程中运行，保证每个后端的峰值内存互不影响"""
+    start = t.perf_counter()
+    classifier = build_classifier(backend, threads)
+    load_time = t.perf_counter() - start
+
+    # 先推理一小批预热，不计入吞吐
+    classify_texts(classifier, texts[:batch_size], batch_size)
+
+    start = t.perf_counter()
+    results = classify_texts(classifier, texts, batch_size)
+    infer_time = t.perf_counter() - start
+    return {
+        'labels': [sentiment for sentiment, _ in results],
+        'load_time': load_time,
+        'speed': len(texts) / infer_time,
+        'peak_rss': peak_rss_mb(),
+    }
+
+
+def load_sample(comments_file, sample, seed=0):
+    with open(comments_file, 'r', encoding='utf-8') as f:
+        comments = json.load(f)
+    texts = [c.get('content', '').strip() for c in comments]
+    texts = [text for text in texts if text]
+    if len(texts) > sample:
+        texts = random.Random(seed).sample(texts, sample)
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="情感模型 CPU 推理后端基准测试（吞吐、峰值内存、与 fp32 的一致率）")
+    parser.add_argument("comments_file", help="评论 JSON 文件，如 data/<电影名>/原始评论数据/all_comments.json")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help=f"逗号分隔，可选 {','.join(BACKENDS)}")
+    parser.add_argument("--sample", type=int, default=500, help="随机抽取的评论条数")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, help="推理线程数（默认由框架决定）")
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    for backend in backends:
+        if backend not in BACKENDS:
+            parser.error(f"未知的推理后端：{backend}")
+    # fp32 作为一致性对照，总是第一个运行
+    backends = ['fp32'] + [b for b in backends if b != 'fp32']
+
+    texts = load_sample(args.comments_file, args.sample)
+    if not texts:
+        print("评论文件中没有可用的评论")
+        return
+    print(f"样本 {len(texts)} 条，批大小 {args.batch_size}，线程数 {args.threads or '默认'}\n")
+
+    ctx = multiprocessing.get_context('spawn')
+    reference = None
+    for backend in backends:
+        with ctx.Pool(1) as pool:
+            try:
+                result = pool.apply(run_backend, (backend, texts, args.batch_size, args.threads))
+            except ImportError as e:
+                print(f"{backend:>5}：缺少依赖，跳过（{e}）")
+                if backend == 'fp32':
+                    return
+                continue
+
+        if reference is None:
+            reference = result['labels']
+        agreed = sum(a == b for a, b in zip(reference, result['labels']))
+        rss = f"{result['peak_rss']:.0f} MB" if result['peak_rss'] is not None else "N/A"
+        print(f"{backend:>5}：加载 {result['load_time']:.1f} 秒，吞吐 {result['speed']:.1f} 条/秒，"
+              f"峰值内存 {rss}，与 fp32 一致率 {agreed / len(texts):.2%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import os
+import re
+import time as t
+
+from lxml import etree
+
+from comment_parser import parse_comment_page
+from response_cache import ResponseCache
+
+
+# ----------------- 原实现（对照组） -----------------
+def legacy_parse_comments(html):
+    """改动前 get_movie_review_by_url 的解析逻辑，只把网络请求换成了传入的 html"""
+    comments_dict = []
+
+    tree = etree.HTML(html)
+
+    comment_list = tree.xpath('//div[@class="comment-item"]')
+    if len(comment_list) == 0:
+        return comments_dict
+
+    for comment_div in comment_list:
+        try:
+            name = comment_div.xpath('.//span[@class="comment-info"]/a/text()')[0].strip()
+        except:
+            name = ''
+        try:
+            content = comment_div.xpath('.//p[@class="comment-content"]/span/text()')[0].strip()
+        except:
+            continue
+        upvote = comment_div.xpath('.//span[@class="votes vote-count"]/text()')[0].strip()
+        time = comment_div.xpath('.//span[@class="comment-time"]/@title')[0]
+        try:
+            location = comment_div.xpath('.//span[@class="comment-location"]/text()')[0].strip()
+        except:
+            location = ''
+
+        try:
+            star_attribute = comment_div.xpath('.//span[contains(@class,"rating")]/@class')[0]
+            stars = re.search(r'\d+', star_attribute).group()[0]
+        except:
+            stars = 0
+
+        comments_dict.append({
+            'name': name,
+            'content': content,
+            'upvote': upvote,
+            'time': time,
+            # 'location': location,
+            'stars': stars
+        })
+
+    return comments_dict
+
+
+def new_parse_comments(html):
+    return [c.to_dict() for c in parse_comment_page(html)]
+
+
+# ----------------- 测试页面 -----------------
+def load_pages(html_dir=None):
+    """从指定目录读取 .html 文件；未指定时使用本地响应缓存中的短评列表页"""
+    pages = []
+    if html_dir:
+        for filename in sorted(os.listdir(html_dir)):
+            if filename.endswith('.html'):
+                with open(os.path.join(html_dir, filename), 'r', encoding='utf-8') as f:
+                    pages.append(f.read())
+    else:
+        for url, text in ResponseCache().iter_entries():
+            if '/comments?' in url:
+                pages.append(text)
+    return pages
+
+
+def bench(func, pages, repeat):
+    start = t.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            func(html)
+    elapsed = t.perf_counter() - start
+    return len(pages) * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="短评解析器基准测试")
+    parser.add_argument("--html-dir", help="保存的短评列表页目录（默认使用 cache/http 中的缓存页面）")
+    parser.add_argument("--repeat", type=int, default=5, help="每个页面重复解析的次数")
+    args = parser.parse_args()
+
+    pages = load_pages(args.html_dir)
+    if not pages:
+        print("没有找到可用的页面，请先抓取一次短评（会自动写入缓存）或通过 --html-dir 指定目录")
+        return
+
+    mismatched = sum(1 for html in pages if legacy_parse_comments(html) != new_parse_comments(html))
+    print(f"共 {len(pages)} 个页面，解析结果不一致的页面：{mismatched} 个")
+
+    legacy_speed = bench(legacy_parse_comments, pages, args.repeat)
+    new_speed = bench(new_parse_comments, pages, args.repeat)
+    print(f"原实现：{legacy_speed:.1f} 页/秒")
+    print(f"新实现：{new_speed:.1f} 页/秒")
+    print(f"加速比：{new_speed / legacy_speed:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from lxml import etree
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 只在模块加载时编译一次
+COMMENT_ITEMS = etree.XPath('//div[@class="comment-item"]')
+STAR_PATTERN = re.compile(r'\d+')
+
+
+@dataclass
+class ShortComment:
+    name: str
+    content: str
+    upvote: int
+    time: Optional[datetime]
+    stars: int          # 0 表示未评分
+    location: str
+    time_text: str      # 页面上的原始时间字符串
+
+    def to_dict(self):
+        """转换为 short_reviews.json 中沿用的格式（数值仍以字符串保存，未评分为 0）"""
+        return {
+            'name': self.name,
+            'content': self.content,
+            'upvote': str(self.upvote),
+            'time': self.time_text,
+            # 'location': self.location,
+            'stars': str(self.stars) if self.stars else 0
+        }
+
+
+def _first_text(el):
+    """相当于 el/text() 的第一个文本节点"""
+    if el.text is not None:
+        return el.text
+    for child in el:
+        if child.tail is not None:
+            return child.tail
+    return None
+
+
+def _child_text(el, tag):
+    """相当于 el/<tag>/text() 的第一个文本节点"""
+    for child in el:
+        if child.tag == tag:
+            text = _first_text(child)
+            if text is not None:
+                return text
+    return None
+
+
+def _to_int(text):
+    text = (text or '').strip()
+    return int(text) if text.isdigit() else 0
+
+
+def parse_comment_item(comment_div):
+    """
+    单次遍历 comment-item 子树，提取用户名、内容、点赞数、时间、地点、星级
+    没有内容的评论返回 None（与原先的 XPath 逻辑一致）
+    """
+    name = content = upvote = time_text = location = star_class = None
+
+    for el in comment_div.iter('span', 'p'):
+        cls = el.get('class')
+        if cls is None:
+            continue
+        if el.tag == 'p':
+            if content is None and cls == 'comment-content':
+                content = _child_text(el, 'span')
+            continue
+
+        if star_class is None and 'rating' in cls:
+            star_class = cls
+        if cls == 'comment-info':
+            if name is None:
+                name = _child_text(el, 'a')
+        elif cls == 'votes vote-count':
+            if upvote is None:
+                upvote = _first_text(el)
+        elif cls == 'comment-time':
+            if time_text is None:
+                time_text = el.get('title')
+        elif cls == 'comment-location':
+            if location is None:
+                location = _first_text(el)
+
+    if content is None:
+        return None
+
+    time_text = time_text or ''
+    try:
+        time = datetime.strptime(time_text, TIME_FORMAT)
+    except ValueError:
+        time = None
+
+    stars = 0
+    if star_class:
+        match = STAR_PATTERN.search(star_class)
+        if match:
+            # allstar50 -> 5
+            stars = int(match.group()[0])
+
+    return ShortComment(
+        name=(name or '').strip(),
+        content=content.strip(),
+        upvote=_to_int(upvote),
+        time=time,
+        stars=stars,
+        location=(location or '').strip(),
+        time_text=time_text
+    )
+
+
+def parse_comment_page(html):
+    """解析短评列表页，返回 ShortComment 列表"""
+    tree = etree.HTML(html)
+    if tree is None:
+        return []
+    comments = []
+    for comment_div in COMMENT_ITEMS(tree):
+        comment = parse_comment_item(comment_div)
+        if comment is not None:
+            comments.append(comment)
+    return comments
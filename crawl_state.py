@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+
+SHORT_TYPES = ["h", "m", "l"]  # 好评 中评 差评
+
+
+# ----------------- JSONL 追加写入 -----------------
+def truncate_jsonl(path, keep_lines):
+    """
+    把 JSONL 文件截断到前 keep_lines 行（丢弃检查点之后写入的行以及崩溃时写了一半的行）
+    返回实际保留的行数
+    """
+    if not os.path.exists(path):
+        return 0
+    kept = 0
+    offset = 0
+    with open(path, 'rb+') as f:
+        for line in f:
+            if kept == keep_lines or not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            kept += 1
+        f.truncate(offset)
+    return kept
+
+
+class JsonlWriter:
+    """逐页追加写入 JSONL，每次写入后落盘，进程中断也不会丢失已抓取的数据"""
+
+    def __init__(self, path, keep_lines=0):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.count = truncate_jsonl(path, keep_lines)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write_many(self, records):
+        for record in records:
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.count += len(records)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl(path):
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_json_array(records, path, indent=4):
+    """
+    流式写出 JSON 数组，输出与 json.dump(records, ensure_ascii=False, indent=indent) 完全一致，
+    但不需要把所有记录同时放进内存
+    """
+    pad = ' ' * indent
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write('[\n' if count == 0 else ',\n')
+            item = json.dumps(record, ensure_ascii=False, indent=indent)
+            f.write('\n'.join(pad + line for line in item.split('\n')))
+            count += 1
+        f.write('\n]' if count else '[]')
+    return count
+
+
+# ----------------- 检查点 -----------------
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    """先写临时文件再替换，避免写到一半时中断导致检查点损坏"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def get_state_dir(movie_name):
+    return os.path.join('./data', movie_name, 'crawl_state')
+
+
+# ----------------- 短评断点 -----------------
+class ShortReviewState:
+    """
+    短评抓取状态：h / m / l 各写一个 JSONL 文件，
+    检查点记录 movie_id 以及每类 percent_type 下一页的 start
+    """
+
+    def __init__(self, movie_name, movie_id):
+        self.movie_name = movie_name
+        self.movie_id = movie_id
+        self.state_dir = get_state_dir(movie_name)
+        self.checkpoint_path = os.path.join(self.state_dir, 'short_reviews_checkpoint.json')
+        os.makedirs(self.state_dir, exist_ok=True)
+
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        if checkpoint and checkpoint['movie_id'] == movie_id:
+            print(f"从断点继续抓取《{movie_name}》短评：{checkpoint['types']}")
+        else:
+            checkpoint = {
+                'movie_id': movie_id,
+                'types': {p: {'start': 0, 'records': 0, 'done': False} for p in SHORT_TYPES}
+            }
+            # 全新抓取：清空上一次遗留的 JSONL
+            for p in SHORT_TYPES:
+                truncate_jsonl(self.jsonl_path(p), 0)
+        self.checkpoint = checkpoint
+        self.writers = {}
+
+    def jsonl_path(self, percent_type):
+        return os.path.join(self.state_dir, f'short_reviews_{percent_type}.jsonl')
+
+    def pending_types(self):
+        return [p for p in SHORT_TYPES if not self.checkpoint['types'][p]['done']]
+
+    def start(self, percent_type):
+        return self.checkpoint['types'][percent_type]['start']
+
+    def writer(self, percent_type):
+        if percent_type not in self.writers:
+            cursor = self.checkpoint['types'][percent_type]
+            self.writers[percent_type] = JsonlWriter(self.jsonl_path(percent_type), cursor['records'])
+        return self.writers[percent_type]
+
+    def commit(self, percent_type, comments, limit):
+        """写入一页评论并推进该类的 start；每条评论记下它来自哪一类，统计时不必再按星级推断"""
+        writer = self.writer(percent_type)
+        writer.write_many([dict(c, percent_type=percent_type) for c in comments])
+        cursor = self.checkpoint['types'][percent_type]
+        cursor['start'] += limit
+        cursor['records'] = writer.count
+        save_checkpoint(self.checkpoint_path, self.checkpoint)
+
+    def finish(self, percent_type):
+        self.checkpoint['types'][percent_type]['done'] = True
+        save_checkpoint(self.checkpoint_path, self.checkpoint)
+
+    def finalize(self):
+        """按 h、m、l 的顺序把 JSONL 合成为 short_reviews.json，完成后删除检查点"""
+        for writer in self.writers.values():
+            writer.close()
+
+        def records():
+            for p in SHORT_TYPES:
+                yield from iter_jsonl(self.jsonl_path(p))
+
+        dir_path = os.path.join('./data', self.movie_name)
+        count = write_json_array(records(), os.path.join(dir_path, 'short_reviews.json'))
+        os.remove(self.checkpoint_path)
+        return count
+
+
+# ----------------- 长评断点 -----------------
+class LongReviewState:
+    """
+    长评抓取状态：列表页结果写入 long_review_list.jsonl，全文写入 long_reviews.jsonl，
+    检查点记录列表页的 start、最后一篇已抓取全文的长评 ID（cursor）以及所有已完成的长评 ID
+    （流水线模式下全文抓取的完成顺序与列表顺序不同）
+    """
+
+    def __init__(self, movie_name, movie_id):
+        self.movie_name = movie_name
+        self.movie_id = movie_id
+        self.state_dir = get_state_dir(movie_name)
+        self.checkpoint_path = os.path.join(self.state_dir, 'long_reviews_checkpoint.json')
+        self.list_path = os.path.join(self.state_dir, 'long_review_list.jsonl')
+        self.jsonl_path = os.path.join(self.state_dir, 'long_reviews.jsonl')
+        os.makedirs(self.state_dir, exist_ok=True)
+
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        if checkpoint and checkpoint['movie_id'] == movie_id:
+            print(f"从断点继续抓取《{movie_name}》长评：列表 start={checkpoint['list_start']}，"
+                  f"全文 cursor={checkpoint['cursor']}，已完成 {len(checkpoint['done'])} 篇")
+        else:
+            checkpoint = {
+                'movie_id': movie_id,
+                'list_start': 0,
+                'list_records': 0,
+                'list_done': False,
+                'cursor': None,
+                'done': [],
+                'records': 0
+            }
+        self.checkpoint = checkpoint
+        self.done = set(checkpoint['done'])
+        self.lock = threading.Lock()  # 流水线模式下列表生产者与全文写入者会同时更新检查点
+        self.list_writer = JsonlWriter(self.list_path, checkpoint['list_records'])
+        self.writer = JsonlWriter(self.jsonl_path, checkpoint['records'])
+
+    @property
+    def list_done(self):
+        return self.checkpoint['list_done']
+
+    @property
+    def list_start(self):
+        return self.checkpoint['list_start']
+
+    def commit_list(self, reviews, page_size):
+        with self.lock:
+            self.list_writer.write_many(reviews)
+            self.checkpoint['list_start'] += page_size
+            self.checkpoint['list_records'] = self.list_writer.count
+            save_checkpoint(self.checkpoint_path, self.checkpoint)
+
+    def finish_list(self):
+        with self.lock:
+            self.checkpoint['list_done'] = True
+            save_checkpoint(self.checkpoint_path, self.checkpoint)
+
+    def pending_reviews(self):
+        """按列表顺序产出已写入列表、但尚未抓取全文的长评"""
+        for r in iter_jsonl(self.list_path):
+            if r['id'] not in self.done:
+                yield r
+
+    def commit_review(self, review_id, record):
+        with self.lock:
+            self.writer.write_many([record])
+            self.done.add(review_id)
+            self.checkpoint['cursor'] = review_id
+            self.checkpoint['done'].append(review_id)
+            self.checkpoint['records'] = self.writer.count
+            save_checkpoint(self.checkpoint_path, self.checkpoint)
+
+    def finalize(self):
+        """
+        把 long_reviews.jsonl 按列表页顺序合成为 long_reviews.json，完成后删除检查点
+        """
+        self.list_writer.close()
+        self.writer.close()
+        order = {r['url']: index for index, r in enumerate(iter_jsonl(self.list_path))}
+        records = sorted(iter_jsonl(self.jsonl_path), key=lambda r: order.get(r['url'], len(order)))
+        dir_path = os.path.join('./data', self.movie_name)
+        count = write_json_array(records, os.path.join(dir_path, 'long_reviews.json'))
+        os.remove(self.checkpoint_path)
+        return count
@@ -0,0 +1,202 @@
+import random
+import threading
+import time as t
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import HostRateLimiter
+from response_cache import ResponseCache, CacheMiss, DEFAULT_TTL
+
+# 请务必替换为自己浏览器中的实际值（见 readme 中的配置说明）
+HEADERS = {
+    "User-Agent": "",
+    "Cookie": "",
+}
+
+CONNECT_TIMEOUT = 5    # 建立连接超时（秒）
+READ_TIMEOUT = 15      # 读取响应超时（秒）
+MAX_RETRIES = 4        # 429 / 5xx / 网络错误的最大重试次数
+BACKOFF_BASE = 1.0     # 指数退避的基数（秒）
+BACKOFF_MAX = 30.0     # 单次退避的上限（秒）
+POOL_SIZE = 16         # 每个域名保持的长连接数
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# ----------------- 请求统计 -----------------
+class FetchStats:
+    """记录请求数、重试数、失败数、下载字节数与累计耗时（线程安全）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.failures = 0
+        self.bytes = 0
+        self.latency = 0.0
+
+    def record(self, nbytes, latency):
+        with self.lock:
+            self.requests += 1
+            self.bytes += nbytes
+            self.latency += latency
+
+    def record_cache_hit(self):
+        with self.lock:
+            self.cache_hits += 1
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+
+    def summary(self):
+        avg = self.latency / self.requests if self.requests else 0
+        return (f"请求 {self.requests} 次，缓存命中 {self.cache_hits} 次，"
+                f"重试 {self.retries} 次，失败 {self.failures} 次，下载 {self.bytes / 1024:.1f} KB，平均耗时 {avg:.3f} 秒")
+
+
+stats = FetchStats()
+
+
+# ----------------- 连接池 -----------------
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+session = _build_session()
+
+# ----------------- 响应缓存 -----------------
+# 默认只把抓到的页面写入缓存（供 --replay 重新解析），实时抓取每次都访问豆瓣；
+# 加上 --cache 才会在有效期内直接使用缓存页面
+cache = ResponseCache()  # None 表示不读写缓存
+use_cache = False        # 实时抓取时是否读取缓存
+replay = False           # 回放模式：只读缓存，不访问网络
+
+
+def configure_cache(enabled=True, read=False, ttl=DEFAULT_TTL, replay_only=False):
+    global cache, use_cache, replay
+    cache = ResponseCache(ttl=ttl) if enabled or replay_only else None
+    use_cache = read
+    replay = replay_only
+
+
+def add_cache_arguments(parser):
+    parser.add_argument("--replay", action="store_true",
+                        help="回放模式：只从本地缓存读取页面，不访问豆瓣（用于修改解析规则后重新解析）")
+    parser.add_argument("--cache", dest="use_cache", action="store_true",
+                        help="实时抓取时直接使用有效期内的缓存页面（默认每次都访问豆瓣，只写入缓存）")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL,
+                        help=f"--cache 时缓存页面的有效期（秒，默认 {DEFAULT_TTL}）")
+    parser.add_argument("--no-cache", action="store_true", help="不读写本地缓存")
+
+
+def configure_from_args(args):
+    if args.use_cache and args.no_cache:
+        raise SystemExit("--cache 与 --no-cache 不能同时使用")
+    configure_cache(enabled=not args.no_cache, read=args.use_cache, ttl=args.cache_ttl,
+                    replay_only=args.replay)
+
+
+# ----------------- 全局限速 -----------------
+limiter = None  # 所有线程 / 协程共享的按域名限速器；None 表示不限速（顺序模式由 polite_sleep 控制节奏）
+
+
+def configure_rate_limit(rate):
+    """rate: 每个域名每秒允许的请求数，传入 None 取消限速"""
+    global limiter
+    limiter = HostRateLimiter(rate) if rate else None
+
+
+def _backoff(attempt, retry_after=None):
+    """指数退避 + 随机抖动；服务器给出 Retry-After 时以其为准"""
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+    delay = min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+    return random.uniform(0, delay)
+
+
+# ----------------- 抓取 -----------------
+def fetch(url):
+    """
+    通过共享的 Session 发起 GET 请求（复用 TCP/TLS 连接）
+    429 / 5xx / 连接错误按指数退避重试，重试用尽后抛出异常
+    配置了全局限速时，每次真正发出的请求（包括重试）都先向限速器申请令牌
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter is not None:
+            limiter.acquire(url)
+        start = t.perf_counter()
+        try:
+            response = session.get(url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        except (requests.ConnectionError, requests.Timeout):
+            stats.record(0, t.perf_counter() - start)
+            if attempt == MAX_RETRIES:
+                stats.record_failure()
+                raise
+            stats.record_retry()
+            t.sleep(_backoff(attempt))
+            continue
+
+        stats.record(len(response.content), t.perf_counter() - start)
+        if response.status_code not in RETRY_STATUS:
+            return response
+        if attempt == MAX_RETRIES:
+            stats.record_failure()
+            response.raise_for_status()
+
+        stats.record_retry()
+        print(f"请求 {url} 返回 {response.status_code}，第 {attempt + 1} 次重试")
+        t.sleep(_backoff(attempt, response.headers.get("Retry-After")))
+
+
+def get_html(url, fresh=False):
+    """
+    开启 --cache 时先查本地缓存，未命中再走网络；成功的响应都会写回缓存
+    fresh=True 时跳过缓存读取（内容随时间变化的页面，如按时间排序的评论列表）
+    回放模式下未命中直接抛出 CacheMiss
+    """
+    if cache is not None and (replay or (use_cache and not fresh)):
+        text = cache.get(url, ignore_ttl=replay)
+        if text is not None:
+            stats.record_cache_hit()
+            return text
+    if replay:
+        raise CacheMiss(url)
+
+    response = fetch(url)
+    if cache is not None and response.ok:
+        cache.put(url, response.text)
+    return response.text
+
+
+def get_parsed(url, parse, fresh=False):
+    """
+    取页面并用 parse 解析；解析结果为空的页面（最后一页之后、反爬验证页、登录页……）
+    从缓存中删除，之后的 --cache 运行不会重放这样的页面。回放模式下不删除缓存
+    """
+    result = parse(get_html(url, fresh=fresh))
+    if not result and cache is not None and not replay:
+        cache.delete(url)
+    return result
+
+
+def polite_sleep():
+    """
+    两次请求之间随机等待 1~2 秒
+    回放模式不访问网络、配置了全局限速时节奏由限速器控制，这两种情况都不需要等待
+    """
+    if not replay and limiter is None:
+        t.sleep(random.uniform(1, 2))
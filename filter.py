@@ -1,53 +1,206 @@
+import json
+import os
+from functools import lru_cache
+
+from aho_corasick import Automaton
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'filter_rules.json')
+DEFAULT_THEME = "mother_daughter"
+
+
+# ----------------- 规则配置 -----------------
+class Rule:
+    """
+    一条规则：
+      {"name": ..., "all": [组, ...]}                 每个关键词组都至少命中一个词
+      {"name": ..., "near": [组A, 组B], "window": N}  两组各有一个词出现，且两者之间相隔不超过 N 个字
+    """
+
+    def __init__(self, name, groups, window=None):
+        self.name = name
+        self.groups = groups
+        self.window = window
+
+    def evaluate(self, matched, content):
+        """matched: 与 self.groups 对应的各组命中的词（未命中为 None）；规则成立时返回相关的词，否则返回 None"""
+        if not all(matched):
+            return None
+        if self.window is not None and not self._near(matched, content):
+            return None
+        return sorted({w for words in matched for w in words})
+
+    def _near(self, matched, content):
+        # 两组的词都已确认出现，这时才去找具体位置（str.find 在 C 层完成）；
+        # 所有出现位置按起点排序，每处只需要和另一组中此前结束得最晚的一处比较距离
+        occurrences = sorted((start, start + len(w), side) for side, words in enumerate(matched)
+                             for w in words for start in find_positions(content, w))
+        last_end = [None, None]
+        for start, end, side in occurrences:
+            other = last_end[1 - side]
+            if other is not None and start - other <= self.window:
+                return True
+            if last_end[side] is None or end > last_end[side]:
+                last_end[side] = end
+        return False
+
+
+def find_positions(content, word):
+    """word 在 content 中所有出现的起点（允许重叠）"""
+    positions = []
+    start = content.find(word)
+    while start != -1:
+        positions.append(start)
+        start = content.find(word, start + 1)
+    return positions
+
+
+class Theme:
+    """一个关系主题：若干关键词组 + 按顺序判断的规则，命中的第一条规则即为该评论的归类依据"""
+
+    def __init__(self, name, label, groups, rules):
+        self.name = name
+        self.label = label
+        self.groups = groups
+        self.rules = rules
+
+
+def parse_theme(config):
+    name = config.get("name")
+    if not name:
+        raise ValueError("主题缺少 name")
+    groups = config.get("groups") or {}
+    for group, words in groups.items():
+        if not isinstance(words, list) or not all(isinstance(w, str) and w for w in words):
+            raise ValueError(f"主题 {name} 的关键词组 {group} 必须是非空字符串列表")
+
+    rules = []
+    for rule in config.get("rules") or []:
+        rule_name = rule.get("name")
+        if ("all" in rule) == ("near" in rule):
+            raise ValueError(f"主题 {name} 的规则 {rule_name} 必须且只能指定 all 或 near 其中之一")
+        if "near" in rule:
+            rule_groups = rule["near"]
+            window = rule.get("window")
+            if len(rule_groups) != 2 or not isinstance(window, int) or window < 0:
+                raise ValueError(f"主题 {name} 的规则 {rule_name}：near 需要两个关键词组和非负整数 window")
+        else:
+            rule_groups = rule["all"]
+            window = None
+        if not rule_groups:
+            raise ValueError(f"主题 {name} 的规则 {rule_name} 没有指定关键词组")
+        for group in rule_groups:
+            if group not in groups:
+                raise ValueError(f"主题 {name} 的规则 {rule_name} 引用了不存在的关键词组 {group}")
+        rules.append(Rule(rule_name, list(rule_groups), window))
+    if not rules:
+        raise ValueError(f"主题 {name} 没有任何规则")
+    return Theme(name, config.get("label", name), groups, rules)
+
+
+def load_themes(path=RULES_PATH):
+    """从 JSON 配置读取所有主题"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    themes = [parse_theme(theme) for theme in config.get("themes", [])]
+    names = [theme.name for theme in themes]
+    if len(set(names)) != len(names):
+        raise ValueError("主题名称重复")
+    return themes
+
+
+# ----------------- 规则引擎 -----------------
+class ThemeMatcher:
+    """
+    所有主题的关键词编译进同一个 Aho-Corasick 自动机，每条评论只扫描一遍，
+    再根据命中的词逐个主题判断规则。增加主题不会增加扫描次数，但命中的词更多、
+    邻近规则还要查找位置，单条评论的耗时仍随主题增加（见 bench_filter.py）
+    """
+
+    def __init__(self, themes):
+        self.themes = themes
+        # 每个 (主题序号, 组名) 占一个二进制位；关键词 -> 它所属的全部组的位掩码，
+        # 同一个词可以属于多个主题、多个组
+        bits = {}
+        self.word_masks = {}
+        for i, theme in enumerate(themes):
+            for group, words in theme.groups.items():
+                bit = bits[(i, group)] = 1 << len(bits)
+                for w in words:
+                    self.word_masks[w] = self.word_masks.get(w, 0) | bit
+        self.automaton = Automaton(self.word_masks)
+        # 每条规则：(规则, 各组的位, 需要同时出现的位)
+        self.rule_masks = []
+        for i, theme in enumerate(themes):
+            rules = []
+            for rule in theme.rules:
+                group_bits = [bits[(i, group)] for group in rule.groups]
+                need = 0
+                for bit in group_bits:
+                    need |= bit
+                rules.append((rule, group_bits, need))
+            self.rule_masks.append(rules)
+
+        # 只有一个主题、且第一条规则只要求一个关键词组时，扫描到该组的词就可以下结论，不必扫完全文
+        self.stop = frozenset()
+        if len(themes) == 1:
+            first = themes[0].rules[0]
+            if first.window is None and len(first.groups) == 1:
+                self.stop = frozenset(themes[0].groups[first.groups[0]])
+
+    def match(self, content):
+        """返回 {主题名: (命中的规则, 命中的关键词)}，只包含命中的主题"""
+        found = self.automaton.find_all(content, self.stop)
+        result = {}
+        if not found:
+            return result
+        # 命中的词按位或合并，规则缺组时只需一次整数比较；规则的各组都出现了才把词分到各组
+        word_masks = self.word_masks
+        present = 0
+        for w in found:
+            present |= word_masks[w]
+        for theme, rules in zip(self.themes, self.rule_masks):
+            for rule, group_bits, need in rules:
+                if present & need != need:
+                    continue
+                matched = [[w for w in found if word_masks[w] & bit] for bit in group_bits]
+                terms = rule.evaluate(matched, content)
+                if terms:
+                    result[theme.name] = (rule.name, terms)
+                    break
+        return result
+
+    def match_comments(self, comments):
+        """批量接口：返回 [(comment, {主题名: (规则, 关键词)})]，与 comments 一一对应"""
+        return [(c, self.match(c["content"])) for c in comments]
+
+
+@lru_cache(maxsize=None)
+def get_matcher(path=RULES_PATH, names=None):
+    """names: 只编译这些主题（元组），默认编译配置中的全部主题"""
+    themes = load_themes(path)
+    if names is not None:
+        by_name = {theme.name: theme for theme in themes}
+        missing = [name for name in names if name not in by_name]
+        if missing:
+            raise ValueError(f"配置中没有主题：{'、'.join(missing)}")
+        themes = [by_name[name] for name in names]
+    return ThemeMatcher(themes)
+
+
+def match_comments(comments, path=RULES_PATH):
+    """用全部主题给每条评论打标签，一次扫描"""
+    return get_matcher(path).match_comments(comments)
+
+
+def filter_theme(comments, theme=DEFAULT_THEME, path=RULES_PATH):
+    """只需要一个主题时单独编译，自动机更小、扫描更快"""
+    return [c for c, matched in get_matcher(path, (theme,)).match_comments(comments) if matched]
+
+
+def match_mother_daughter(content):
+    """返回 (命中的规则, 命中的关键词列表)，不相关时返回 None"""
+    return get_matcher(RULES_PATH, (DEFAULT_THEME,)).match(content).get(DEFAULT_THEME)
+
+
 def filter_mother_daughter(comments):
-    # 一级关键词（直接命中母女关系，扩充隐喻/方言/场景词）
-    strong_keywords = [
-        "母女", "母子" , "母女关系", "母女情", "母女线", "母女档",
-        "母爱", "亲子关系", "母职", "妈妈们", "母亲角色",
-        "单亲妈妈", "独生女", "母女俩", "娘亲", "囡囡", "小棉袄",
-        "慈母", "贤女", "母性光辉", "抚养女儿", "养育女儿", "陪伴女儿"
-    ]
-
-    # 二级关键词（母亲相关，补充同义/方言/敬称）
-    mother_words = [
-        "妈妈", "母亲", "娘", "妈", "母" ,"老妈", "妈咪", "娘亲",
-        "她妈", "他妈", "单亲妈妈", "慈母", "母上", "母親大人",
-        "宝妈", "母性", "养母", "继母"  # 补充常见母亲相关称谓
-    ]
-
-    # 二级关键词（女儿相关，补充同义/方言/爱称）
-    daughter_words = [
-        "女儿", "闺女", "姑娘", "小姑娘", "丫头", "囡囡", "小棉袄",
-        "她女儿", "他女儿", "独生女", "贤女", "乖女儿", "囡儿",
-        "千金", "小丫头", "干女儿"  # 补充常见女儿相关称谓
-    ]
-    filtered = []
-
-    for c in comments:
-        content = c["content"]
-
-        # 1. 强匹配：只要出现这些就直接选
-        if any(k in content for k in strong_keywords):
-            filtered.append(c)
-            continue
-
-        # 2. 母 / 女任意组合匹配
-        if any(m in content for m in mother_words) and \
-                any(d in content for d in daughter_words):
-            filtered.append(c)
-            continue
-
-        # 3. “她和她妈”“她和女儿”的句型
-        if ("她" in content) and ("妈" in content):
-            filtered.append(c)
-            continue
-        if ("她" in content) and ("女儿" in content):
-            filtered.append(c)
-            continue
-
-        # 4. 亲情戏 + 女性（常见于影评，但不一定是母女）
-        if ("亲情戏" in content or "家庭线" in content) and \
-                ("母" in content or "妈" in content):
-            filtered.append(c)
-            continue
-
-    return filtered
\ No newline at end of file
+    return filter_theme(comments, DEFAULT_THEME)
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+
+from crawl_state import get_state_dir, save_checkpoint
+
+RAW_SUBDIR = '原始评论数据'  # organize.py 归档后原始数据所在的子目录
+
+
+# ----------------- 原始数据读写 -----------------
+def find_raw_file(movie_name, filename):
+    """
+    爬虫默认写到 data/<电影名>/ 下，organize.py 归档后会移到 原始评论数据/ 下，
+    优先返回已存在的那个路径，都不存在时返回爬虫默认路径
+    """
+    default_path = os.path.join('./data', movie_name, filename)
+    archived_path = os.path.join('./data', movie_name, RAW_SUBDIR, filename)
+    if not os.path.exists(default_path) and os.path.exists(archived_path):
+        return archived_path
+    return default_path
+
+
+def load_raw(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def file_signature(path):
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+# ----------------- 身份标识 -----------------
+def short_review_key(comment):
+    """短评身份：用户名 + 时间 + 内容哈希"""
+    raw = f"{comment.get('name', '')}\x1f{comment.get('time', '')}\x1f{comment.get('content', '')}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def long_review_key(review):
+    """长评身份：长评 ID（列表页记录有 id 字段，已保存的长评从 url 中取出）"""
+    if 'id' in review:
+        return str(review['id'])
+    return review['url'].rstrip('/').split('/')[-1]
+
+
+KINDS = {
+    'short': ('short_reviews.json', short_review_key),
+    'long': ('long_reviews.json', long_review_key),
+}
+
+
+# ----------------- 已见索引 -----------------
+class SeenIndex:
+    """
+    每部电影每类评论（short / long）一个持久化索引，记录已经抓到的评论身份
+    如果原始 JSON 在索引之外被改写过（例如重新完整抓取），按文件签名自动从原始数据重建
+    """
+
+    def __init__(self, movie_name, kind):
+        self.movie_name = movie_name
+        self.kind = kind
+        self.filename, self.key_func = KINDS[kind]
+        self.path = os.path.join(get_state_dir(movie_name), f'seen_{kind}.json')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        data = None
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+        raw_path = find_raw_file(movie_name, self.filename)
+        if data and data['signature'] == file_signature(raw_path):
+            self.keys = set(data['keys'])
+        else:
+            self.keys = {self.key_func(item) for item in load_raw(raw_path)}
+
+    def contains(self, item):
+        return self.key_func(item) in self.keys
+
+    def merge(self, new_items):
+        """把新条目追加到原始 JSON 末尾，并更新索引"""
+        raw_path = find_raw_file(self.movie_name, self.filename)
+        items = load_raw(raw_path)
+        items.extend(new_items)
+        os.makedirs(os.path.dirname(raw_path), exist_ok=True)
+        with open(raw_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False, indent=4)
+
+        self.keys.update(self.key_func(item) for item in new_items)
+        self.save()
+        return raw_path
+
+    def save(self):
+        save_checkpoint(self.path, {
+            'signature': file_signature(find_raw_file(self.movie_name, self.filename)),
+            'keys': sorted(self.keys)
+        })
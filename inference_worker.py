@@ -0,0 +1,241 @@
+import argparse
+import getpass
+import os
+import secrets
+import stat
+import tempfile
+import threading
+import time as t
+from multiprocessing.connection import Client, Listener
+
+from segment_cache import segment_text
+from sentiment_inference import (BACKENDS, DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, build_classifier,
+                                 classify_chunked, classify_texts)
+
+# multiprocessing.connection 会反序列化收到的请求，因此不监听 TCP 端口：
+# Linux / macOS 上使用放在仅本用户可访问（0700）目录中的 Unix 套接字，Windows 上使用命名管道；
+# 另外每次启动服务都生成随机密钥，保存在仅本用户可读写（0600）的文件中，连接时双方校验
+SOCKET_NAME = 'inference_worker.sock'
+AUTHKEY_NAME = 'inference_worker.key'
+AUTHKEY_BYTES = 32
+
+
+# ----------------- 地址与密钥 -----------------
+def _check_private(path, is_dir):
+    """只接受属于当前用户、其他人无任何权限的真实文件 / 目录（不跟随符号链接）"""
+    st = os.lstat(path)
+    kind_ok = stat.S_ISDIR(st.st_mode) if is_dir else stat.S_ISREG(st.st_mode)
+    if not kind_ok or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{path} 不是当前用户私有的{'目录' if is_dir else '文件'}，拒绝使用")
+
+
+def runtime_dir():
+    """存放套接字和密钥文件的目录，只有当前用户可以访问"""
+    if os.name == 'nt':
+        # %LOCALAPPDATA% 默认只对当前用户开放
+        path = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.expanduser('~'), 'douban-film-analysis')
+        os.makedirs(path, exist_ok=True)
+        return path
+    path = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(), f'douban-worker-{os.getuid()}')
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    _check_private(path, is_dir=True)
+    return path
+
+
+def worker_address():
+    """返回 (地址, 连接类型)"""
+    if os.name == 'nt':
+        return rf'\\.\pipe\douban-inference-worker-{getpass.getuser()}', 'AF_PIPE'
+    return os.path.join(runtime_dir(), SOCKET_NAME), 'AF_UNIX'
+
+
+def create_authkey():
+    """生成新的随机密钥，以 0600 权限写入密钥文件（先写临时文件再替换）"""
+    key = secrets.token_bytes(AUTHKEY_BYTES)
+    path = os.path.join(runtime_dir(), AUTHKEY_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    os.replace(tmp_path, path)
+    return key
+
+
+def read_authkey():
+    """读取服务启动时生成的密钥；服务从未启动过时返回 None"""
+    path = os.path.join(runtime_dir(), AUTHKEY_NAME)
+    if not os.path.exists(path):
+        return None
+    if os.name != 'nt':
+        _check_private(path, is_dir=False)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _connect():
+    """连接正在运行的服务，未运行或密钥不对时抛出异常"""
+    authkey = read_authkey()
+    if authkey is None:
+        raise ConnectionError("推理服务未启动")
+    address, family = worker_address()
+    return Client(address, family=family, authkey=authkey)
+
+
+# ----------------- 服务端 -----------------
+class InferenceWorker:
+    """常驻进程：模型和 jieba 词典只加载一次，之后按请求批量推理 / 分词与提取关键词"""
+
+    def __init__(self, backend=DEFAULT_BACKEND, threads=None):
+        import jieba
+
+        self.backend = backend
+        start = t.time()
+        self.classifier = build_classifier(backend, threads)
+        print(f"模型（{backend}）加载完成，耗时 {t.time() - start:.2f} 秒")
+        jieba.initialize()
+        # 多个分析任务可同时连接，但同一时间只让一个批次占用模型
+        self.model_lock = threading.Lock()
+        self.running = True
+
+    def handle(self, request):
+        op = request.get('op')
+        if op == 'ping':
+            return {'ok': True, 'backend': self.backend}
+        if op == 'classify':
+            texts = request['texts']
+            batch_size = request.get('batch_size', DEFAULT_BATCH_SIZE)
+            chunking = request.get('chunking')
+            with self.model_lock:
+                if chunking:
+                    results = classify_chunked(self.classifier, texts, batch_size, *chunking)
+                else:
+                    results = classify_texts(self.classifier, texts, batch_size)
+            return {'ok': True, 'results': results}
+        if op == 'segment':
+            return {'ok': True, 'results': [segment_text(text) for text in request['texts']]}
+        if op == 'shutdown':
+            self.running = False
+            return {'ok': True}
+        return {'ok': False, 'error': f'未知的请求类型：{op}'}
+
+    def serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    response = self.handle(request)
+                except Exception as e:
+                    response = {'ok': False, 'error': str(e)}
+                conn.send(response)
+
+    def serve(self):
+        address, family = worker_address()
+        if family == 'AF_UNIX' and os.path.exists(address):
+            try:
+                _connect().close()
+            except Exception:
+                os.remove(address)  # 上次异常退出留下的套接字文件
+            else:
+                print(f"推理服务已在运行：{address}")
+                return
+        authkey = create_authkey()
+        with Listener(address, family=family, authkey=authkey) as listener:
+            if family == 'AF_UNIX':
+                os.chmod(address, 0o600)
+            print(f"推理服务已启动：{address}（Ctrl+C 或 --stop 停止）")
+            while self.running:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    # 密钥不对等握手失败只影响这一个连接
+                    print(f"拒绝连接：{e}")
+                    continue
+                threading.Thread(target=self.serve_connection, args=(conn,), daemon=True).start()
+        print("推理服务已停止")
+
+
+# ----------------- 客户端 -----------------
+class InferenceClient:
+    def __init__(self, conn, backend):
+        self.conn = conn
+        self.backend = backend
+
+    def _call(self, request):
+        self.conn.send(request)
+        response = self.conn.recv()
+        if not response.get('ok'):
+            raise RuntimeError(f"推理服务返回错误：{response.get('error')}")
+        return response
+
+    def classify(self, texts, batch_size=DEFAULT_BATCH_SIZE, chunking=None):
+        return self._call({'op': 'classify', 'texts': list(texts), 'batch_size': batch_size,
+                           'chunking': chunking})['results']
+
+    def segment(self, texts):
+        """返回 [(tokens, tags)]，可直接作为 segment_cache.segment_texts 的 compute 参数"""
+        return self._call({'op': 'segment', 'texts': list(texts)})['results']
+
+    def close(self):
+        self.conn.close()
+
+
+def connect_worker(backend=DEFAULT_BACKEND):
+    """
+    连接本机的常驻推理服务；服务未启动、连接失败或服务的推理后端与要求不一致时返回 None，
+    调用方应退回进程内推理
+    """
+    try:
+        conn = _connect()
+    except Exception:
+        return None
+    client = InferenceClient(conn, backend)
+    try:
+        worker_backend = client._call({'op': 'ping'})['backend']
+    except Exception:
+        client.close()
+        return None
+    if worker_backend != backend:
+        print(f"推理服务使用的后端为 {worker_backend}，与要求的 {backend} 不一致，改为进程内推理")
+        client.close()
+        return None
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="常驻情感推理服务（模型与 jieba 词典只加载一次）")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND, help="CPU 推理后端")
+    parser.add_argument("--threads", type=int, help="推理线程数（默认由框架决定）")
+    parser.add_argument("--stop", action="store_true", help="停止正在运行的推理服务")
+    args = parser.parse_args()
+
+    if args.stop:
+        try:
+            conn = _connect()
+        except Exception:
+            print("推理服务未运行")
+            return
+        with conn:
+            conn.send({'op': 'shutdown'})
+            conn.recv()
+        # 服务端在 accept 上阻塞，再连一次让它检查退出标志
+        try:
+            _connect().close()
+        except Exception:
+            pass
+        print("已通知推理服务停止")
+        return
+
+    try:
+        InferenceWorker(args.backend, args.threads).serve()
+    except KeyboardInterrupt:
+        print("推理服务已停止")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from segment_cache import jieba_stop_words, segment_texts
+
+DATA_ROOT = './data'
+RAW_SUBDIR = '原始评论数据'
+MIN_DF = 2     # 至少出现在这么多条评论中的词才参与打分，过滤错别字和生僻词
+TOP_N = 30
+TOPIC_FILE = 'comment_keywords.csv'   # sentiment_topic_analysis.py 的主题词结果，render_farm.py 据此出图
+
+
+# ----------------- 语料 -----------------
+def load_stopwords(path='stopwords.txt'):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return set(f.read().splitlines())
+    return set()
+
+
+def load_comment_texts(json_path):
+    """读取合并后的评论文件，返回去首尾空白后的非空评论；文件不存在时返回 None"""
+    if not os.path.exists(json_path):
+        return None
+    with open(json_path, 'r', encoding='utf-8') as f:
+        comments = json.load(f)
+    texts = [c.get("content", "").strip() for c in comments]
+    return [text for text in texts if text]
+
+
+def load_corpus(base_dir=DATA_ROOT):
+    """读取每部电影合并后的评论（data/<电影名>/原始评论数据/all_comments.json），返回 {movie_name: [text]}"""
+    corpus = {}
+    if not os.path.exists(base_dir):
+        return corpus
+    for movie in sorted(os.listdir(base_dir)):
+        texts = load_comment_texts(os.path.join(base_dir, movie, RAW_SUBDIR, "all_comments.json"))
+        if texts is not None:
+            corpus[movie] = texts
+    return corpus
+
+
+def is_term(word, stopwords, jieba_stops):
+    """
+    与 extract_tags 相同的过滤规则（至少两个字、不在 jieba 停用词中），再加上项目自己的停用词表；
+    jieba_stops 由调用方用 jieba_stop_words() 取一次后传入，不在逐词判断时反复查找
+    """
+    return len(word.strip()) >= 2 and word.lower() not in jieba_stops and word not in stopwords
+
+
+# ----------------- 关键词引擎 -----------------
+class KeywordEngine:
+    """
+    把所有电影的评论一次性构造成稀疏的 文档-词 计数矩阵（行：评论，列：词），
+    IDF 在本项目自己的评论语料上拟合，打分全部用矩阵运算完成：
+      tfidf_keywords      - 某部电影内部的 TF-IDF 关键词
+      distinctive_keywords - 该电影相对其他电影的区分度（带先验的对数几率比 z 值）
+    """
+
+    def __init__(self, corpus, stopwords=(), min_df=MIN_DF):
+        self.movies = list(corpus)
+        all_texts = list(chain.from_iterable(corpus.values()))
+        jieba_stops = jieba_stop_words()
+        token_lists = [[w for w in tokens if is_term(w, stopwords, jieba_stops)]
+                       for tokens, _ in segment_texts(all_texts)]
+
+        # 行区间：每部电影的评论在矩阵中的起止行
+        self.rows = {}
+        start = 0
+        for movie in self.movies:
+            self.rows[movie] = (start, start + len(corpus[movie]))
+            start += len(corpus[movie])
+
+        vocab = {}
+        indices = np.fromiter(
+            (vocab.setdefault(w, len(vocab)) for tokens in token_lists for w in tokens), dtype=np.int64
+        )
+        indptr = np.zeros(len(token_lists) + 1, dtype=np.int64)
+        np.cumsum([len(tokens) for tokens in token_lists], out=indptr[1:])
+        matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float64), indices, indptr),
+            shape=(len(token_lists), len(vocab))
+        )
+        matrix.sum_duplicates()
+
+        # 过滤文档频率过低的词
+        df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        keep = np.flatnonzero(df >= min_df)
+        words = np.array(list(vocab), dtype=object)
+        self.words = words[keep]
+        self.matrix = matrix[:, keep].tocsr()
+        self.df = df[keep]
+
+        # 平滑 IDF：log((1 + N) / (1 + df)) + 1
+        n_docs = self.matrix.shape[0]
+        self.idf = np.log((1 + n_docs) / (1 + self.df)) + 1
+        self.term_counts = np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    def movie_matrix(self, movie):
+        start, end = self.rows[movie]
+        return self.matrix[start:end]
+
+    def movie_counts(self, movie):
+        return np.asarray(self.movie_matrix(movie).sum(axis=0)).ravel()
+
+    def tfidf_keywords(self, movie, top_n=TOP_N):
+        """每条评论先按长度归一化词频（TF），乘以 IDF 后对该电影的所有评论取平均"""
+        sub = self.movie_matrix(movie)
+        row_sums = np.asarray(sub.sum(axis=1)).ravel()
+        row_sums[row_sums == 0] = 1
+        tf = sparse.diags(1 / row_sums) @ sub
+        scores = np.asarray(tf.sum(axis=0)).ravel() * self.idf / max(sub.shape[0], 1)
+        doc_freq = np.bincount(sub.indices, minlength=sub.shape[1])
+        order = np.argsort(-scores, kind='stable')[:top_n]
+        order = order[scores[order] > 0]
+        return pd.DataFrame({
+            "word": self.words[order],
+            "score": scores[order],
+            "df": doc_freq[order],
+        })
+
+    def distinctive_keywords(self, movie, top_n=TOP_N):
+        """
+        以全部电影的词频为先验，比较该电影与其余电影的对数几率比（Monroe 等人的方法），
+        z 值越大说明这个词越能把这部电影和其他电影区分开
+        """
+        counts = self.movie_counts(movie)
+        rest = self.term_counts - counts
+        prior = self.term_counts
+        n_movie, n_rest, a0 = counts.sum(), rest.sum(), prior.sum()
+
+        delta = (np.log((counts + prior) / (n_movie + a0 - counts - prior))
+                 - np.log((rest + prior) / (n_rest + a0 - rest - prior)))
+        z = delta / np.sqrt(1 / (counts + prior) + 1 / (rest + prior))
+        order = np.argsort(-z, kind='stable')[:top_n]
+        return pd.DataFrame({
+            "word": self.words[order],
+            "z": z[order],
+            "count": counts[order].astype(np.int64),
+            "background_count": rest[order].astype(np.int64),
+        })
+
+
+def topic_keywords(engine, movie, top_n=TOP_N):
+    """comment_keywords.csv 使用的 TF-IDF 主题词：以词为索引、得分为值的 Series"""
+    top = engine.tfidf_keywords(movie, top_n)
+    return pd.Series(top["score"].values, index=top["word"].values)
+
+
+# ----------------- 主程序 -----------------
+def main():
+    parser = argparse.ArgumentParser(description="基于本项目评论语料的 TF-IDF 主题词与电影区分度关键词")
+    parser.add_argument("movies", nargs="*", help="只输出这些电影的结果（IDF 仍在全部电影上拟合），默认全部")
+    parser.add_argument("--top", type=int, default=TOP_N, help=f"每部电影输出的关键词个数（默认 {TOP_N}）")
+    parser.add_argument("--min-df", type=int, default=MIN_DF, help=f"最小文档频率（默认 {MIN_DF}）")
+    parser.add_argument("--topic-csv", action="store_true",
+                        help=f"同时写出 {TOPIC_FILE}（与 sentiment_topic_analysis.py 默认的 TF-IDF 主题词相同）")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    if not corpus:
+        print("未找到任何 all_comments.json，请先运行 sentiment_topic_analysis.py 合并评论")
+        return
+    for movie in args.movies:
+        if movie not in corpus:
+            parser.error(f"未找到《{movie}》的 all_comments.json")
+
+    print(f"共 {len(corpus)} 部电影，{sum(len(v) for v in corpus.values())} 条评论")
+    engine = KeywordEngine(corpus, load_stopwords(), args.min_df)
+    print(f"文档-词矩阵：{engine.matrix.shape[0]} × {engine.matrix.shape[1]}，非零元素 {engine.matrix.nnz}")
+
+    for movie in args.movies or engine.movies:
+        out_dir = os.path.join(DATA_ROOT, movie, RAW_SUBDIR)
+        tfidf_path = os.path.join(out_dir, "comment_keywords_tfidf.csv")
+        distinct_path = os.path.join(out_dir, "distinctive_keywords.csv")
+        engine.tfidf_keywords(movie, args.top).to_csv(tfidf_path, index=False, encoding="utf-8-sig")
+        distinctive = engine.distinctive_keywords(movie, args.top)
+        distinctive.to_csv(distinct_path, index=False, encoding="utf-8-sig")
+        if args.topic_csv:
+            topic_path = os.path.join(out_dir, TOPIC_FILE)
+            topic_keywords(engine, movie).to_csv(topic_path, header=["score"], encoding="utf-8-sig")
+        print(f"《{movie}》区分度最高的词：{'、'.join(distinctive['word'].head(10))}")
+        print(f"  已保存：{tfidf_path}，{distinct_path}")
+
+
+if __name__ == '__main__':
+    main()
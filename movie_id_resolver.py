@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import time as t
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from fetcher import get_parsed
+
+RESOLVER_CACHE = './cache/movie_ids.json'
+RESOLVER_TTL = 30 * 24 * 3600  # 名称 -> 豆瓣 ID 的缓存有效期（秒）
+DATA_MARKER = 'window.__DATA__'
+
+_lock = threading.Lock()
+_cache = None
+
+
+# ----------------- 搜索结果解析 -----------------
+def parse_search_page(html):
+    """
+    只解析页面中的 window.__DATA__ = {...}; 数据块，不再对整页 HTML 做贪婪正则
+    返回 {movie_id: title}
+    """
+    pos = html.find(DATA_MARKER)
+    if pos == -1:
+        return {}
+    start = html.find('{', pos)
+    if start == -1:
+        return {}
+    try:
+        data, _ = json.JSONDecoder().raw_decode(html, start)
+    except json.JSONDecodeError:
+        return {}
+
+    result = {}
+    for item in data.get('items', []):
+        if 'id' in item and 'title' in item:
+            result[int(item['id'])] = item['title']
+    return result
+
+
+def search_movie(movie_name):
+    url = f'https://search.douban.com/movie/subject_search?search_text={quote(movie_name)}'
+    return get_parsed(url, parse_search_page)
+
+
+def _search_quietly(movie_name):
+    """批量解析时单个名称失败不影响其他名称"""
+    try:
+        return search_movie(movie_name)
+    except Exception as e:
+        print(f"搜索《{movie_name}》失败：{e}")
+        return {}
+
+
+# ----------------- 持久化缓存 -----------------
+def _load_cache():
+    global _cache
+    if _cache is None:
+        _cache = {}
+        if os.path.exists(RESOLVER_CACHE):
+            with open(RESOLVER_CACHE, 'r', encoding='utf-8') as f:
+                _cache = json.load(f)
+    return _cache
+
+
+def _save_cache():
+    os.makedirs(os.path.dirname(RESOLVER_CACHE), exist_ok=True)
+    tmp_path = RESOLVER_CACHE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(_cache, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, RESOLVER_CACHE)
+
+
+def _cached(movie_name):
+    entry = _load_cache().get(movie_name)
+    if entry is None or t.time() - entry['fetched_at'] > RESOLVER_TTL:
+        return None
+    # JSON 的键只能是字符串，取出时还原为 int
+    return {int(k): v for k, v in entry['results'].items()}
+
+
+def _store(movie_name, results):
+    _load_cache()[movie_name] = {
+        'fetched_at': t.time(),
+        'results': {str(k): v for k, v in results.items()}
+    }
+
+
+# ----------------- 对外接口 -----------------
+def get_movie_id(movie_name):
+    """
+    返回 {movie_id: title}，已缓存且未过期的名称不发任何网络请求
+    """
+    with _lock:
+        results = _cached(movie_name)
+    if results is not None:
+        return results
+
+    results = search_movie(movie_name)
+    if results:
+        with _lock:
+            _store(movie_name, results)
+            _save_cache()
+    return results
+
+
+def resolve_many(movie_names, workers=4):
+    """
+    批量解析：先查缓存，未命中的名称统一在一轮中并发搜索（受 fetcher 全局限速约束），
+    最后一次性写回缓存。返回 {movie_name: {movie_id: title}}
+    """
+    resolved = {}
+    missing = []
+    with _lock:
+        for name in dict.fromkeys(movie_names):
+            results = _cached(name)
+            if results is None:
+                missing.append(name)
+            else:
+                resolved[name] = results
+
+    if missing:
+        print(f"缓存命中 {len(resolved)} 个，需要搜索 {len(missing)} 个")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for name, results in zip(missing, pool.map(_search_quietly, missing)):
+                resolved[name] = results
+        with _lock:
+            for name in missing:
+                if resolved[name]:
+                    _store(name, resolved[name])
+            _save_cache()
+    return resolved
+
+
+def pick_movie_id(movie_name, candidates):
+    """优先取标题以该名称开头的结果，否则取第一个结果；没有结果时返回 None"""
+    for movie_id, title in candidates.items():
+        if title.startswith(movie_name):
+            return movie_id
+    return next(iter(candidates), None)
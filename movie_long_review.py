@@ -1,34 +1,51 @@
-import requests
 from lxml import etree
-import re
-import time as t
-import random
 import os
 import json
+import argparse
+import queue
+import threading
+import fetcher
+from fetcher import get_parsed, polite_sleep, stats
+from movie_id_resolver import get_movie_id
+from crawl_state import LongReviewState
+from incremental import SeenIndex
 
+PAGE_SIZE = 20
+DEFAULT_WORKERS = 4   # 流水线模式下并发抓取全文的线程数
+DEFAULT_RPS = 1.0     # 流水线模式下每个域名每秒的请求预算
 
-def get_html(url):
-    headers = {
-        "User-Agent": "",
-        "Cookie": "",
-    }
-    return requests.get(url=url, headers=headers).text
 
+def positive_int(value):
+    """argparse 类型：至少为 1 的整数（线程数为 0 时队列不限长、没有消费者，流水线会卡住）"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须是至少为 1 的整数：{value}")
+    return number
 
-def get_movie_id(movie_name):
-    url = f'https://search.douban.com/movie/subject_search?search_text={movie_name}'
 
-    response_text = get_html(url)
-    # 使用正则表达式提取 "id" 和 "title"
-    pattern = r'"id":\s*(\d+).*?"title":\s*"([^"]+)"'
-
-    matches = re.findall(pattern, response_text)
+def parse_longreview_list(html):
+    """
+    解析长评列表页，返回 [{'id', 'title', 'url'}]
+    """
+    tree = etree.HTML(html)
 
-    # 将结果转换为字典
-    result = {int(match[0]): match[1].encode().decode('unicode_escape') for match in matches}
+    reviews = []
+    for it in tree.xpath('//div[@class="main review-item"]'):
+        review_id = it.xpath('./@id')[0].split('_')[-1]  # review_item id="review_12345"
+        title = it.xpath('.//h2/a/text()')[0].strip()
+        link = it.xpath('.//h2/a/@href')[0]
+        reviews.append({
+            'id': review_id,
+            'title': title,
+            'url': link
+        })
+    return reviews
 
-    return result
+def build_longreview_list_url(movie_id, start):
+    return f'https://movie.douban.com/subject/{movie_id}/reviews?start={start}'
 
+def build_latest_longreview_list_url(movie_id, start):
+    return f'https://movie.douban.com/subject/{movie_id}/reviews?sort=time&start={start}'
 
 def get_movie_longreviews(movie_id, max_pages=5):
     """
@@ -37,28 +54,15 @@ def get_movie_longreviews(movie_id, max_pages=5):
     """
     reviews = []
     for page in range(max_pages):
-        start = page * 20
-        url = f'https://movie.douban.com/subject/{movie_id}/reviews?start={start}'
+        url = build_longreview_list_url(movie_id, page * PAGE_SIZE)
         print("长评列表页：", url)
 
-        html = get_html(url)
-        tree = etree.HTML(html)
-
-        items = tree.xpath('//div[@class="main review-item"]')
+        items = get_parsed(url, parse_longreview_list)
         if not items:
             break
+        reviews.extend(items)
 
-        for it in items:
-            review_id = it.xpath('./@id')[0].split('_')[-1]  # review_item id="review_12345"
-            title = it.xpath('.//h2/a/text()')[0].strip()
-            link = it.xpath('.//h2/a/@href')[0]
-            reviews.append({
-                'id': review_id,
-                'title': title,
-                'url': link
-            })
-
-        t.sleep(random.uniform(1, 2))
+        polite_sleep()
 
     return reviews
 
@@ -66,12 +70,12 @@ def get_longreview_content(url):
     """
     抓取单篇长评全文
     """
-    html = get_html(url)
-    tree = etree.HTML(html)
+    return get_parsed(url, parse_longreview_content)
 
+def parse_longreview_content(html):
+    tree = etree.HTML(html)
     paragraphs = tree.xpath('//div[@class="review-content clearfix"]//p/text()')
-    text = "\n".join(p.strip() for p in paragraphs if p.strip())
-    return text
+    return "\n".join(p.strip() for p in paragraphs if p.strip())
 
 def get_all_longreviews(movie_id):
     review_list = get_movie_longreviews(movie_id)
@@ -85,7 +89,7 @@ def get_all_longreviews(movie_id):
             "url": r["url"],
             "content": content
         })
-        t.sleep(random.uniform(1, 2))
+        polite_sleep()
 
     print(f"共抓到 {len(long_reviews)} 篇长评")
     return long_reviews
@@ -98,7 +102,183 @@ def save_long_reviews(movie_name, reviews):
         json.dump(reviews, f, ensure_ascii=False, indent=4)
 
 
+def crawl_all_longreviews(movie_name, movie_id, max_pages=5):
+    """
+    断点续爬：列表页与全文都逐条追加到 JSONL，检查点记录列表页进度与长评 ID 游标，
+    中断后重新运行会从断点继续，全部抓完后再由 JSONL 生成 long_reviews.json
+    """
+    state = LongReviewState(movie_name, movie_id)
+
+    while not state.list_done:
+        if state.list_start >= max_pages * PAGE_SIZE:
+            state.finish_list()
+            break
+        url = build_longreview_list_url(movie_id, state.list_start)
+        print("长评列表页：", url)
+
+        items = get_parsed(url, parse_longreview_list)
+        if not items:
+            state.finish_list()
+            break
+        state.commit_list(items, PAGE_SIZE)
+        polite_sleep()
+
+    for r in state.pending_reviews():
+        print("抓取长评全文：", r['url'])
+        content = get_longreview_content(r['url'])
+        state.commit_review(r['id'], {
+            "title": r["title"],
+            "url": r["url"],
+            "content": content
+        })
+        polite_sleep()
+
+    count = state.finalize()
+    print(f"共抓到 {count} 篇长评")
+    return count
+
+
+# ----------------- 增量抓取 -----------------
+def crawl_new_longreviews(movie_name, movie_id):
+    """
+    增量抓取：按时间倒序翻列表页，只抓取索引中没有的长评全文，
+    遇到整页都已抓过时停止，新长评合并进已有的 long_reviews.json，返回新增篇数
+    """
+    index = SeenIndex(movie_name, 'long')
+    new_reviews = []
+    start = 0
+    while True:
+        url = build_latest_longreview_list_url(movie_id, start)
+        print("长评列表页：", url)
+
+        items = get_parsed(url, parse_longreview_list, fresh=True)
+        fresh_items = [r for r in items if not index.contains(r)]
+        if not fresh_items:
+            break
+
+        polite_sleep()
+        for r in fresh_items:
+            print("抓取长评全文：", r['url'])
+            new_reviews.append({
+                "title": r["title"],
+                "url": r["url"],
+                "content": get_longreview_content(r['url'])
+            })
+            polite_sleep()
+        start += PAGE_SIZE
+
+    if new_reviews:
+        path = index.merge(new_reviews)
+        print(f"新增 {len(new_reviews)} 篇长评，已合并到 {path}")
+    else:
+        print("没有新的长评")
+    return len(new_reviews)
+
+
+# ----------------- 流水线抓取 -----------------
+def crawl_all_longreviews_pipelined(movie_name, movie_id, max_pages=5, workers=DEFAULT_WORKERS, rate=DEFAULT_RPS):
+    """
+    生产者/消费者流水线：列表页解析出的长评立即进入有界队列，
+    由 workers 个线程并发抓取全文，所有请求共享 fetcher 的全局限速预算，抓到一篇写一篇
+    同样支持断点续爬，最终 long_reviews.json 仍按列表页顺序输出
+    """
+    if workers < 1:
+        raise ValueError("workers 至少为 1")
+    fetcher.configure_rate_limit(rate)
+    state = LongReviewState(movie_name, movie_id)
+    tasks = queue.Queue(maxsize=workers * 2)
+    results = queue.Queue()
+    producer_errors = []
+
+    def produce():
+        try:
+            # 断点续爬：先处理已在列表中但还没抓到全文的长评
+            for r in state.pending_reviews():
+                tasks.put(r)
+
+            while not state.list_done:
+                if state.list_start >= max_pages * PAGE_SIZE:
+                    state.finish_list()
+                    break
+                url = build_longreview_list_url(movie_id, state.list_start)
+                print("长评列表页：", url)
+
+                items = get_parsed(url, parse_longreview_list)
+                if not items:
+                    state.finish_list()
+                    break
+                state.commit_list(items, PAGE_SIZE)
+                for r in items:
+                    tasks.put(r)
+        except Exception as e:
+            producer_errors.append(e)
+        finally:
+            for _ in range(workers):
+                tasks.put(None)
+
+    def consume():
+        while True:
+            r = tasks.get()
+            if r is None:
+                break
+            try:
+                results.put((r, get_longreview_content(r['url']), None))
+            except Exception as e:
+                results.put((r, None, e))
+        results.put(None)
+
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [threading.Thread(target=consume, daemon=True) for _ in range(workers)]
+    for th in threads:
+        th.start()
+
+    # 写入只发生在主线程：谁先抓完谁先落盘
+    finished = 0
+    failed = 0
+    while finished < workers:
+        item = results.get()
+        if item is None:
+            finished += 1
+            continue
+        r, content, error = item
+        if error is not None:
+            failed += 1
+            print(f"抓取长评全文失败：{r['url']}（{error}）")
+            continue
+        print("抓取长评全文：", r['url'])
+        state.commit_review(r['id'], {
+            "title": r["title"],
+            "url": r["url"],
+            "content": content
+        })
+
+    for th in threads:
+        th.join()
+    if producer_errors:
+        raise producer_errors[0]
+    if failed:
+        raise RuntimeError(f"{failed} 篇长评全文抓取失败，重新运行即可从断点继续")
+
+    count = state.finalize()
+    print(f"共抓到 {count} 篇长评")
+    return count
+
+
 def main():
+    parser = argparse.ArgumentParser(description="豆瓣长评采集")
+    parser.add_argument("--max-pages", type=int, default=5, help="最多抓取多少页长评列表（每页 20 篇）")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="流水线模式：列表页与全文抓取重叠进行，多线程并发抓取全文")
+    parser.add_argument("--workers", type=positive_int, default=DEFAULT_WORKERS,
+                        help=f"流水线模式下抓取全文的线程数（默认 {DEFAULT_WORKERS}）")
+    parser.add_argument("--rps", type=float, default=DEFAULT_RPS,
+                        help=f"流水线模式下每个域名每秒的请求预算（默认 {DEFAULT_RPS}）")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量模式：按时间倒序只抓取上次之后的新长评并合并进已有数据")
+    fetcher.add_cache_arguments(parser)
+    args = parser.parse_args()
+    fetcher.configure_from_args(args)
+
     movie_name = input("请输入电影名称：")
     movie_id_dict = get_movie_id(movie_name)
 
@@ -109,10 +289,17 @@ def main():
     movie_id = list(movie_id_dict.keys())[movie_index-1]
 
     # 只抓长评，不做任何统计
-    comments_dict = get_all_longreviews(movie_id)
-    save_long_reviews(movie_name, comments_dict)
+    if args.incremental:
+        crawl_new_longreviews(movie_name, movie_id)
+        print(f"网络统计：{stats.summary()}")
+        return
+    if args.pipeline:
+        count = crawl_all_longreviews_pipelined(movie_name, movie_id, args.max_pages, args.workers, args.rps)
+    else:
+        count = crawl_all_longreviews(movie_name, movie_id, args.max_pages)
 
-    print(f"长评已保存，共 {len(comments_dict)} 条")
+    print(f"长评已保存，共 {count} 条")
+    print(f"网络统计：{stats.summary()}")
     print("请运行 wordcloud_gen.py 来生成母女关系词云图。")
 
 
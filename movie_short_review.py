@@ -1,122 +1,184 @@
-import requests
-from lxml import etree
-import re
-import time as t
-import random
-import os
-import json
-
-
-def get_html(url):
-    headers = {
-        "User-Agent": "",
-        "Cookie": "",
-    }
-    return requests.get(url=url, headers=headers).text
-
-def get_movie_id(movie_name):
-    url = f'https://search.douban.com/movie/subject_search?search_text={movie_name}'
-    
-    response_text = get_html(url)
-    # 使用正则表达式提取 "id" 和 "title"
-    pattern = r'"id":\s*(\d+).*?"title":\s*"([^"]+)"'
-
-    matches = re.findall(pattern, response_text)
-
-    # 将结果转换为字典
-    result = {int(match[0]): match[1].encode().decode('unicode_escape') for match in matches}
-
-    return result
-
-def get_movie_review_by_url(url):
-    comments_dict = []
-
-    tree = etree.HTML(get_html(url))
-
-    comment_list = tree.xpath('//div[@class="comment-item"]')
-    if len(comment_list) == 0:
-        return comments_dict
-    
-    for comment_div in comment_list:
-        try:
-            name = comment_div.xpath('.//span[@class="comment-info"]/a/text()')[0].strip()
-        except:
-            name = ''
-        try:
-            content = comment_div.xpath('.//p[@class="comment-content"]/span/text()')[0].strip()
-        except:
-            continue
-        upvote = comment_div.xpath('.//span[@class="votes vote-count"]/text()')[0].strip()
-        time = comment_div.xpath('.//span[@class="comment-time"]/@title')[0]
-        try:
-            location = comment_div.xpath('.//span[@class="comment-location"]/text()')[0].strip()
-        except:
-            location = ''
-        
-        try:
-            star_attribute = comment_div.xpath('.//span[contains(@class,"rating")]/@class')[0]
-            stars = re.search(r'\d+', star_attribute).group()[0]
-        except:
-            stars = 0
-
-        comments_dict.append({
-            'name': name,
-            'content': content,
-            'upvote': upvote,
-            'time': time,
-            # 'location': location,
-            'stars': stars
-        })
-
-    return comments_dict
-
-def get_movie_review(movie_id):
-    comments = []
-    limit = 20
-    types = ["h", "m", "l"]  # 好评 中评 差评
-
-    for percent_type in types:
-        page = 0
+import fetcher
+from fetcher import get_parsed, polite_sleep, stats
+from movie_id_resolver import get_movie_id
+import argparse
+import asyncio
+from crawl_state import ShortReviewState, SHORT_TYPES
+from incremental import SeenIndex
+from comment_parser import parse_comment_page
+
+LIMIT = 20
+DEFAULT_RPS = 1.0  # 异步模式下每个域名每秒允许的请求数
+
+
+def get_movie_review_by_url(url, fresh=False):
+    # 解析逻辑见 comment_parser.py（预编译 + 单次遍历），这里保持原有的字典格式
+    return [c.to_dict() for c in get_parsed(url, parse_comment_page, fresh=fresh)]
+
+def build_review_url(movie_id, percent_type, start):
+    return (
+        f'https://movie.douban.com/subject/{movie_id}/comments?'
+        f'percent_type={percent_type}&start={start}&limit={LIMIT}&sort=new_score&status=P'
+    )
+
+def crawl_movie_review(movie_name, movie_id):
+    """
+    断点续爬：每页结果立即追加到 JSONL 并更新检查点，中断后重新运行会从断点继续，
+    全部抓完后再由 JSONL 生成 short_reviews.json，返回评论总数
+    """
+    state = ShortReviewState(movie_name, movie_id)
+
+    for percent_type in state.pending_types():
         while True:
-            url = (
-                f'https://movie.douban.com/subject/{movie_id}/comments?'
-                f'percent_type={percent_type}&start={page}&limit={limit}&sort=new_score&status=P'
-            )
+            url = build_review_url(movie_id, percent_type, state.start(percent_type))
             print(url)
 
             tmp = get_movie_review_by_url(url)
             if not tmp:
+                state.finish(percent_type)
                 break
 
-            comments.extend(tmp)
-            page += limit
-            t.sleep(random.uniform(1, 2))
+            state.commit(percent_type, tmp, LIMIT)
+            polite_sleep()
 
+    count = state.finalize()
     print("==================影评获取完毕===================")
-    print(f'共获取 {len(comments)} 条影评')
-    return comments
-
-def save_movie_review(movie_name, comments_dict):
-    dir_path = f'./data/{movie_name}'
-    os.makedirs(dir_path, exist_ok=True)
-    with open(os.path.join(dir_path, 'short_reviews.json'), 'w', encoding='utf-8') as f:
-        json.dump(comments_dict, f, ensure_ascii=False, indent=4)
-
-def main():
-    movie_name = input("请输入电影名称：")
+    print(f'共获取 {count} 条影评')
+    return count
+
+# ----------------- 增量抓取 -----------------
+def build_latest_review_url(movie_id, start):
+    return (
+        f'https://movie.douban.com/subject/{movie_id}/comments?'
+        f'start={start}&limit={LIMIT}&sort=time&status=P'
+    )
+
+def crawl_new_reviews(movie_name, movie_id):
+    """
+    增量抓取：按时间倒序翻页，只保留索引中没有的短评，
+    遇到整页都已抓过时停止，新短评合并进已有的 short_reviews.json，返回新增条数
+    """
+    index = SeenIndex(movie_name, 'short')
+    new_comments = []
+    page = 0
+    while True:
+        url = build_latest_review_url(movie_id, page)
+        print(url)
+
+        tmp = get_movie_review_by_url(url, fresh=True)
+        fresh_items = [c for c in tmp if not index.contains(c)]
+        new_comments.extend(fresh_items)
+        if not fresh_items:
+            break
+
+        page += LIMIT
+        polite_sleep()
+
+    if new_comments:
+        path = index.merge(new_comments)
+        print(f"新增 {len(new_comments)} 条短评，已合并到 {path}")
+    else:
+        print("没有新的短评")
+    return len(new_comments)
+
+# ----------------- 异步并发抓取 -----------------
+async def get_movie_review_by_type_async(state, percent_type):
+    """
+    顺序翻页抓取某一类（好评/中评/差评）短评，翻页间隔由全局限速器决定而不是固定 sleep
+    """
+    while True:
+        url = build_review_url(state.movie_id, percent_type, state.start(percent_type))
+        print(url)
+
+        # lxml 与 requests 都是阻塞调用，放到线程池里执行（限速器的等待也发生在线程里）
+        tmp = await asyncio.to_thread(get_movie_review_by_url, url)
+        if not tmp:
+            state.finish(percent_type)
+            break
+
+        state.commit(percent_type, tmp, LIMIT)
+
+async def get_movie_review_async(movie_name, movie_id):
+    """
+    h / m / l 三类同时抓取（同样支持断点续爬），
+    结果仍按 h、m、l 的顺序合成 short_reviews.json，与顺序模式输出一致
+    """
+    state = ShortReviewState(movie_name, movie_id)
+    await asyncio.gather(
+        *(get_movie_review_by_type_async(state, percent_type) for percent_type in state.pending_types())
+    )
+    count = state.finalize()
+
+    print(f"==================《{movie_name}》影评获取完毕===================")
+    print(f'共获取 {count} 条影评')
+    return count
+
+async def get_movies_review_async(movies, rate=DEFAULT_RPS):
+    """
+    多部电影同时抓取，所有请求共享 fetcher 中同一个按域名划分的令牌桶
+    movies: {movie_name: movie_id}
+    rate: 每个域名每秒允许的请求数
+    返回 {movie_name: 评论条数}
+    """
+    fetcher.configure_rate_limit(rate)
+    results = await asyncio.gather(
+        *(get_movie_review_async(movie_name, movie_id) for movie_name, movie_id in movies.items())
+    )
+    return dict(zip(movies, results))
+
+def choose_movie_id(movie_name):
     movie_id_dict = get_movie_id(movie_name)
 
     for index, movie_id in enumerate(movie_id_dict):
         print(f"{index+1}. {movie_id_dict[movie_id]}")
 
     movie_index = int(input("请输入电影ID："))
-    movie_id = list(movie_id_dict.keys())[movie_index-1]
+    return list(movie_id_dict.keys())[movie_index-1]
+
+def main_async(rate):
+    movies = {}
+    while True:
+        movie_name = input("请输入电影名称（直接回车开始抓取）：").strip()
+        if not movie_name:
+            break
+        movies[movie_name] = choose_movie_id(movie_name)
+
+    results = asyncio.run(get_movies_review_async(movies, rate=rate))
+    for movie_name, count in results.items():
+        print(f"《{movie_name}》短评已保存，共 {count} 条")
+    print(f"网络统计：{stats.summary()}")
+    print("请运行 wordcloud_gen.py 来生成母女关系词云图。")
 
-    # 只抓短评，不做任何统计
-    comments_dict = get_movie_review(movie_id)
-    save_movie_review(movie_name, comments_dict)
+def main():
+    parser = argparse.ArgumentParser(description="豆瓣短评采集")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="异步并发模式：好评/中评/差评及多部电影同时抓取")
+    parser.add_argument("--rps", type=float, default=DEFAULT_RPS,
+                        help=f"异步模式下每个域名每秒的请求预算（默认 {DEFAULT_RPS}）")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量模式：按时间倒序只抓取上次之后的新短评并合并进已有数据")
+    fetcher.add_cache_arguments(parser)
+    args = parser.parse_args()
+    if args.use_async and args.incremental:
+        parser.error("--incremental 只支持同步模式，不能与 --async 同时使用")
+    fetcher.configure_from_args(args)
+
+    if args.use_async:
+        main_async(args.rps)
+        return
 
-    print(f"短评已保存，共 {len(comments_dict)} 条")
+    movie_name = input("请输入电影名称：")
+    movie_id = choose_movie_id(movie_name)
+
+    # 只抓短评，不做任何统计
+    if args.incremental:
+        crawl_new_reviews(movie_name, movie_id)
+        print(f"网络统计：{stats.summary()}")
+        return
+    count = crawl_movie_review(movie_name, movie_id)
+
+    print(f"短评已保存，共 {count} 条")
+    print(f"网络统计：{stats.summary()}")
     print("请运行 wordcloud_gen.py 来生成母女关系词云图。")
 
 
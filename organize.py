@@ -23,6 +23,8 @@ CATEGORY_MAP = {
         "comment_keywords.png",  # 主题词柱状图
         "word_frequencies.csv",  # 词语出现频率统计
         "word_frequencies.png",  # 词频可视化图表
+        "theme_counts.csv",      # 各关系主题在各来源中的相关评论数
+        "rating_stats.json",     # 星级、点赞与时间分布统计
         "wordcloud.png"          # 评论关键词词云图
     ],
     "分析过程日志": [
@@ -1,19 +1,7 @@
 import os
-import json
-import jieba
-import jieba.analyse
 import pandas as pd
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-from collections import Counter
 
-
-# ----------------- 数据读取 -----------------
-def load_json(path):
-    if os.path.exists(path):
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+from term_counts import TermCounts, cloud_weights, load_or_build, term_counts_path
 
 
 # ----------------- 主逻辑 -----------------
@@ -32,74 +20,45 @@ def main():
     else:
         stopwords = set()
 
-    all_comments = []
+    parts = []
 
     # ----------------- 遍历所有电影文件夹 -----------------
+    # 每部电影分析时已经保存了精确词频（原始评论数据/term_counts.npz），这里只做合并；
+    # 缺少计数文件的电影（例如新加入的电影）才会读取 all_comments.json 统计一次并保存
     for movie in os.listdir(base_dir):
         movie_dir = os.path.join(base_dir, movie)
         if not os.path.isdir(movie_dir):
             continue
 
         json_path = os.path.join(movie_dir, "原始评论数据", "all_comments.json")
+        counts_path = term_counts_path(movie, base_dir)
 
-        if not os.path.exists(json_path):
+        if not os.path.exists(json_path) and not os.path.exists(counts_path):
             print(f"[跳过] 未找到：{json_path}")
             continue
 
-        print(f"[读取] {json_path}")
-        comments = load_json(json_path)
-
-        for c in comments:
-            content = c.get("content", "").strip()
-            if content:
-                all_comments.append(content)
+        print(f"[读取] {counts_path if os.path.exists(counts_path) else json_path}")
+        counts = load_or_build(movie, stopwords, base_dir)
+        if counts is not None:
+            parts.append(counts)
 
-    print(f"\n共载入评论：{len(all_comments)} 条")
+    totals = TermCounts.merge(parts)
+    print(f"\n共载入评论：{totals.n_docs} 条，{len(totals.vocab)} 个词")
 
-    if len(all_comments) == 0:
+    if totals.total == 0:
         print("没有任何评论可用于统计，程序结束。")
         return
 
-    # ----------------- 提取关键词并合并成语料 -----------------
-    processed_strings = []
-    for text in all_comments:
-        kws = " ".join(jieba.analyse.extract_tags(text, topK=20, withWeight=False))
-        processed_strings.append(kws)
-
-    full_text = " ".join([w for w in processed_strings if w not in stopwords])
-
-    # ----------------- 生成词云 -----------------
-    wc = WordCloud(
-        background_color="white",
-        width=1000,
-        height=800,
-        font_path=r"C:\Windows\Fonts\SIMSUN.TTC",
-        stopwords=stopwords,
-        max_words=200
-    )
-
-    try:
-        wc.generate(full_text)
-    except ValueError:
-        print("词云生成失败：文本为空。")
-        return
-
-    # 保存词云
-    plt.figure(figsize=(12, 9))
-    plt.imshow(wc, interpolation="bilinear")
-    plt.axis("off")
-    plt.tight_layout()
-    plt.savefig("overall_keywords.png", dpi=300)
-    plt.close()
-    print("已保存 overall_keywords.png")
-
     # ----------------- 词频统计 -----------------
-    word_freq = wc.words_     # 归一化权重
-    total_words = sum(len(c.split()) for c in all_comments)
+    # 只做词云的选词和归一化（与 generate_from_frequencies 相同），
+    # 词云和柱状图由 render_farm.py 根据 overall_word_frequencies.csv 渲染
+    frequencies = totals.to_dict()
+    word_freq = cloud_weights(frequencies, 200)     # 归一化权重
+    total_words = totals.total  # 精确的分词总数
 
     data = []
     for word, weight in word_freq.items():
-        count = int(weight * total_words)
+        count = frequencies[word]
         data.append({
             "word": word,
             "count": count,
@@ -111,21 +70,7 @@ def main():
     df.to_csv("overall_word_frequencies.csv", index=False, encoding="utf-8-sig")
     print("已保存 overall_word_frequencies.csv")
 
-    # ----------------- 绘制柱状图 -----------------
-    top_n = 50
-    top_df = df.head(top_n)
-
-    plt.figure(figsize=(16, 8))
-    plt.bar(top_df["word"], top_df["count"], width=0.5, color=plt.cm.viridis(range(top_n)))
-    plt.xticks(rotation=45, ha="right", fontproperties="SimSun")
-    plt.ylabel("出现次数", fontproperties="SimSun")
-    plt.title(f"总体词频统计（前 {top_n}）", fontproperties="SimSun")
-    plt.grid(axis="y", linestyle="--", alpha=0.4)
-    plt.tight_layout()
-    plt.savefig("overall_word_frequencies.png", dpi=400)
-    plt.close()
-
-    print("已保存 overall_word_frequencies.png")
+    print("词云与柱状图请运行：python render_farm.py")
     print("\n整体分析完成。")
 
 
@@ -0,0 +1,402 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from render_farm import KEYWORDS_INPUT, WORDCLOUD_INPUT, chart_jobs
+from sentiment_inference import MODEL_LOCK_PATH
+from sentiment_summary import SENTIMENT_FILE, SENTIMENT_SUBDIRS
+from term_counts import TERM_COUNTS_FILE
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_ROOT = './data'
+RAW_SUBDIR = '原始评论数据'
+STATE_PATH = './cache/pipeline_state.json'
+LOG_DIR = './cache/pipeline_logs'
+HASH_CHUNK = 1 << 20
+
+# 爬虫 / 小红书导出的原始数据文件
+RAW_FILES = ('short_reviews.json', 'long_reviews.json', 'xhs_comments.csv', 'xhs_contents.csv')
+# 同时加载情感模型的进程数，模型占用内存较大，默认一次只跑一个
+DEFAULT_MODEL_JOBS = 1
+
+
+# ----------------- 文件指纹 -----------------
+class FileHashes:
+    """文件内容的 SHA-1，按 (大小, 修改时间) 缓存，未变化的文件不必重新读取"""
+
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+        self.lock = threading.Lock()
+
+    def digest(self, path):
+        if not os.path.exists(path):
+            return 'missing'
+        stat = os.stat(path)
+        key = os.path.normpath(path)
+        with self.lock:
+            cached = self.entries.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                h.update(chunk)
+        with self.lock:
+            self.entries[key] = [stat.st_size, stat.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+
+class PipelineState:
+    """cache/pipeline_state.json：每个阶段上次成功运行时的输入指纹，以及文件哈希缓存"""
+
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        stages, files = {}, {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            stages, files = cached.get('stages', {}), cached.get('files', {})
+        self.stages = stages
+        self.hashes = FileHashes(files)
+
+    def fingerprint(self, stage):
+        """阶段的输入指纹：命令参数（不含解释器路径） + 每个输入文件的路径和内容哈希（缺失的文件记为 missing）"""
+        command = stage.command[1:] if stage.command else stage.name
+        h = hashlib.sha1(json.dumps(command, ensure_ascii=False).encode('utf-8'))
+        for path in sorted(set(stage.inputs)):
+            h.update(f"\0{os.path.normpath(path)}\0{self.hashes.digest(path)}".encode('utf-8'))
+        return h.hexdigest()
+
+    def is_fresh(self, stage, fingerprint):
+        return self.stages.get(stage.name) == fingerprint and all(os.path.exists(p) for p in stage.outputs)
+
+    def record(self, stage, fingerprint):
+        with self.lock:
+            self.stages[stage.name] = fingerprint
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with self.hashes.lock:
+            files = dict(self.hashes.entries)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'stages': self.stages, 'files': files}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+# ----------------- 阶段定义 -----------------
+class Stage:
+    """
+    流水线中的一个阶段
+    command: 在项目目录下执行的脚本命令（列表）；action: 进程内执行的函数，二者取其一
+    inputs / outputs: 声明的输入输出文件；输入指纹不变且输出都在时跳过
+    limit: 资源组名称，同一组内同时运行的阶段数受限（例如情感模型）
+    """
+
+    def __init__(self, name, inputs, outputs, command=None, action=None, deps=(), limit=None, always=False):
+        self.name = name
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.command = command
+        self.action = action
+        self.deps = list(deps)
+        self.limit = limit
+        self.always = always    # 没有可以比较的输入（如网络抓取），每次都运行
+
+
+def movie_dir(movie):
+    return os.path.join(DATA_ROOT, movie)
+
+
+def raw_dir(movie):
+    return os.path.join(DATA_ROOT, movie, RAW_SUBDIR)
+
+
+def list_movies(base_dir=DATA_ROOT):
+    if not os.path.exists(base_dir):
+        return []
+    return sorted(name for name in os.listdir(base_dir)
+                  if os.path.isdir(os.path.join(base_dir, name)) and name != '总分析')
+
+
+def script_modules(script, seen=None):
+    """
+    脚本本身及其（直接或间接）导入的全部项目模块，按源码中的 import 语句（包括函数内的延迟导入）查找，
+    修改其中任何一个文件都会改变阶段的指纹
+    """
+    seen = set() if seen is None else seen
+    if script in seen:
+        return seen
+    seen.add(script)
+    with open(os.path.join(SCRIPT_DIR, script), 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=script)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            module = name.split('.')[0] + '.py'
+            if os.path.exists(os.path.join(SCRIPT_DIR, module)):
+                script_modules(module, seen)
+    return seen
+
+
+def code_inputs(script):
+    return sorted(script_modules(script))
+
+
+def sync_raw(movie, hashes):
+    """
+    把爬虫写在电影目录下的原始数据复制到“原始评论数据”（情感分析读取的位置），内容相同的文件不复制；
+    与 organize.py 不同，不会删除或移动任何已有文件
+    """
+    copied = []
+    for filename in RAW_FILES:
+        src = os.path.join(movie_dir(movie), filename)
+        dst = os.path.join(raw_dir(movie), filename)
+        if os.path.exists(src) and hashes.digest(src) != hashes.digest(dst):
+            os.makedirs(raw_dir(movie), exist_ok=True)
+            shutil.copy2(src, dst)
+            copied.append(filename)
+    return f"已复制：{'、'.join(copied)}" if copied else "原始数据无变化"
+
+
+def build_stages(movies, all_movies, hashes, python=sys.executable, backend=None, chunked=False,
+                 manifest=None):
+    """
+    每部电影：sync（同步原始数据）→ sentiment（合并 + 情感）→ stats（筛选 + 统计 + 词频）→ render（出图）
+    跨影片：keywords（TF-IDF 主题词，render 依赖它），overall（汇总词频）→ render_overall，spectrum（情感光谱）
+    """
+    stages = []
+    crawl_deps = []
+    if manifest:
+        stages.append(Stage('crawl', [manifest], [], [python, 'batch_crawl.py', manifest, '--incremental'],
+                            always=True))
+        crawl_deps = ['crawl']
+
+    # TF-IDF 主题词要在全部电影的语料上拟合 IDF，由所有电影合并完成后的 keywords 阶段统一生成；
+    # 每部电影的 sentiment 阶段只依赖这部电影自己的数据
+    analysis_args = ['--keywords', 'none']
+    if backend:
+        analysis_args += ['--backend', backend]
+    if chunked:
+        analysis_args.append('--chunked')
+
+    for movie in movies:
+        raw = raw_dir(movie)
+        top = movie_dir(movie)
+        stages.append(Stage(
+            f'{movie}/sync', [os.path.join(top, f) for f in RAW_FILES], [],
+            action=lambda movie=movie: sync_raw(movie, hashes), deps=crawl_deps,
+        ))
+        stages.append(Stage(
+            f'{movie}/sentiment',
+            # 删除模型版本记录（升级模型）后需要重新分析
+            [os.path.join(raw, f) for f in RAW_FILES] + ['stopwords.txt', MODEL_LOCK_PATH]
+            + code_inputs('sentiment_topic_analysis.py'),
+            [os.path.join(raw, f) for f in ('all_comments.json', 'comment_sentiment.csv', TERM_COUNTS_FILE)],
+            [python, 'sentiment_topic_analysis.py', movie] + analysis_args,
+            deps=[f'{movie}/sync'], limit='model',
+        ))
+        # wordcloud_gen.py 优先读取电影目录下的原始数据，没有时读取整理后的文件，两处都算作输入
+        stages.append(Stage(
+            f'{movie}/stats',
+            [os.path.join(d, f) for d in (top, raw) for f in RAW_FILES]
+            + ['stopwords.txt', 'filter_rules.json'] + code_inputs('wordcloud_gen.py'),
+            [os.path.join(top, f) for f in ('theme_counts.csv', 'rating_stats.json', WORDCLOUD_INPUT)],
+            [python, 'wordcloud_gen.py', movie],
+            deps=[f'{movie}/sync'],
+        ))
+        stages.append(Stage(
+            f'{movie}/render',
+            [os.path.join(top, WORDCLOUD_INPUT), os.path.join(raw, KEYWORDS_INPUT)] + code_inputs('render_farm.py'),
+            # 与 render_farm.movie_jobs 对这两个词频文件生成的图片一致
+            [job[2] for job in chart_jobs(movie, top, [WORDCLOUD_INPUT])
+             + chart_jobs(movie, raw, [KEYWORDS_INPUT])],
+            [python, 'render_farm.py', movie, '--no-overall'],
+            deps=['keywords', f'{movie}/stats'],
+        ))
+
+    # 跨影片的阶段读取全部电影的结果，但只依赖本次处理的电影
+    sentiment_deps = [f'{movie}/sentiment' for movie in movies]
+    keyword_inputs = ['stopwords.txt'] + code_inputs('keyword_engine.py')
+    keyword_outputs = []
+    for movie in all_movies:
+        corpus_file = os.path.join(raw_dir(movie), 'all_comments.json')
+        keyword_inputs.append(corpus_file)
+        if movie in movies or os.path.exists(corpus_file):
+            keyword_outputs += [os.path.join(raw_dir(movie), f) for f in
+                                (KEYWORDS_INPUT, 'comment_keywords_tfidf.csv', 'distinctive_keywords.csv')]
+    stages.append(Stage('keywords', keyword_inputs, keyword_outputs,
+                        [python, 'keyword_engine.py', '--topic-csv'], deps=sentiment_deps))
+    overall_inputs = ['stopwords.txt'] + code_inputs('overall.py')
+    for movie in all_movies:
+        overall_inputs += [os.path.join(raw_dir(movie), f) for f in (TERM_COUNTS_FILE, 'all_comments.json')]
+    stages.append(Stage('overall', overall_inputs, ['overall_word_frequencies.csv'],
+                        [python, 'overall.py'], deps=sentiment_deps))
+    stages.append(Stage('render_overall', ['overall_word_frequencies.csv'] + code_inputs('render_farm.py'),
+                        ['overall_keywords.png', 'overall_word_frequencies.png'],
+                        [python, 'render_farm.py', '--overall-only'], deps=['overall']))
+
+    spectrum_inputs = code_inputs('sentiment_spectrum_optimized_chinese.py')
+    for movie in all_movies:
+        # 光谱脚本读取几个可能位置中最新的 comment_sentiment.csv
+        spectrum_inputs += [os.path.join(movie_dir(movie), sub, SENTIMENT_FILE) for sub in SENTIMENT_SUBDIRS]
+    stages.append(Stage('spectrum', spectrum_inputs,
+                        ['movie_sentiment_spectrum_optimized_chinese.png', 'movie_sentiment_spectrum.csv'],
+                        [python, 'sentiment_spectrum_optimized_chinese.py'], deps=sentiment_deps))
+    return stages
+
+
+# ----------------- 调度 -----------------
+class PipelineRunner:
+    """
+    按依赖关系调度各阶段：依赖都完成后立即开始，互不依赖的电影和阶段并行执行；
+    某个阶段失败时，依赖它的阶段不再执行，其他电影照常进行
+    """
+
+    def __init__(self, stages, state, jobs=None, model_jobs=DEFAULT_MODEL_JOBS, force=False, dry_run=False):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"阶段 {stage.name} 依赖的 {dep} 不存在")
+        self.state = state
+        self.jobs = jobs or os.cpu_count() or 1
+        self.limits = {'model': threading.Semaphore(max(1, model_jobs))}
+        self.force = force
+        self.dry_run = dry_run
+        self.results = {}       # 阶段名 -> ('运行' / '跳过' / '失败' / '未执行', 说明)
+        self.print_lock = threading.Lock()
+
+    def log(self, message):
+        with self.print_lock:
+            print(message, flush=True)
+
+    def _execute(self, stage):
+        """在线程中执行一个阶段，返回 (状态, 说明)"""
+        if self.dry_run and any(self.results[dep][0] == '运行' for dep in stage.deps):
+            # 演练时上游并没有真正运行，输入文件还是旧的
+            return '运行', '上游需要重新运行'
+        fingerprint = self.state.fingerprint(stage)
+        if not (self.force or stage.always) and self.state.is_fresh(stage, fingerprint):
+            return '跳过', '输入未变化'
+        if self.dry_run:
+            return '运行', '输入有变化'
+
+        start = time.time()
+        if stage.action is not None:
+            note = stage.action()
+        else:
+            semaphore = self.limits.get(stage.limit)
+            if semaphore is not None:
+                semaphore.acquire()
+            try:
+                note = self._run_command(stage)
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+        if not stage.always:
+            self.state.record(stage, fingerprint)
+        return '运行', f"{note}，耗时 {time.time() - start:.1f} 秒" if note else f"耗时 {time.time() - start:.1f} 秒"
+
+    def _run_command(self, stage):
+        """子进程的输出写入 cache/pipeline_logs/<阶段名>.log，避免多个阶段的输出交错"""
+        os.makedirs(LOG_DIR, exist_ok=True)
+        log_path = os.path.join(LOG_DIR, stage.name.replace('/', '__') + '.log')
+        env = dict(os.environ, PYTHONIOENCODING='utf-8')
+        with open(log_path, 'w', encoding='utf-8') as log:
+            result = subprocess.run(stage.command, cwd=SCRIPT_DIR, stdin=subprocess.DEVNULL,
+                                    stdout=log, stderr=subprocess.STDOUT, env=env)
+        if result.returncode != 0:
+            raise RuntimeError(f"退出码 {result.returncode}，日志：{log_path}")
+        return None
+
+    def run(self):
+        pending = dict(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                # 依赖失败的阶段直接标记为未执行
+                for name, stage in list(pending.items()):
+                    if any(self.results.get(dep, ('',))[0] in ('失败', '未执行') for dep in stage.deps):
+                        self.results[name] = ('未执行', '上游阶段失败')
+                        self.log(f"[未执行] {name}：上游阶段失败")
+                        del pending[name]
+                for name, stage in list(pending.items()):
+                    if all(dep in self.results for dep in stage.deps):
+                        running[pool.submit(self._execute, stage)] = name
+                        del pending[name]
+                if not running:
+                    if pending:
+                        raise ValueError(f"存在循环依赖：{'、'.join(pending)}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as e:
+                        self.results[name] = ('失败', f"{type(e).__name__}: {e}")
+                    status, note = self.results[name]
+                    self.log(f"[{status}] {name}：{note}")
+        if not self.dry_run:
+            self.state.save()
+        return self.results
+
+
+# ----------------- 主程序 -----------------
+def main():
+    parser = argparse.ArgumentParser(description="增量分析流水线：只重新运行输入有变化的阶段，互不依赖的阶段并行执行")
+    parser.add_argument("movies", nargs="*", help="只处理这些电影（跨影片汇总仍包含全部电影），默认 data 目录下的全部电影")
+    parser.add_argument("--crawl", metavar="MANIFEST", help="先用 batch_crawl.py 增量抓取清单中的电影")
+    parser.add_argument("--jobs", type=int, help="同时运行的阶段数（默认为 CPU 核数）")
+    parser.add_argument("--model-jobs", type=int, default=DEFAULT_MODEL_JOBS,
+                        help=f"同时运行情感分析的电影数（默认 {DEFAULT_MODEL_JOBS}）")
+    parser.add_argument("--backend", help="传给 sentiment_topic_analysis.py 的推理后端")
+    parser.add_argument("--chunked", action="store_true", help="情感分析使用长文本分窗模式")
+    parser.add_argument("--force", action="store_true", help="忽略指纹，全部重新运行")
+    parser.add_argument("--dry-run", action="store_true", help="只列出需要运行的阶段，不实际执行")
+    args = parser.parse_args()
+
+    os.chdir(SCRIPT_DIR)
+    all_movies = list_movies()
+    movies = args.movies or all_movies
+    if args.crawl:
+        from batch_crawl import load_manifest
+        movies = list(dict.fromkeys(movies + [name for name, _ in load_manifest(args.crawl)]))
+        all_movies = list(dict.fromkeys(all_movies + movies))
+    if not movies:
+        print("data 目录下没有电影，可以用 --crawl 指定抓取清单")
+        return
+
+    state = PipelineState()
+    stages = build_stages(movies, all_movies, state.hashes, backend=args.backend, chunked=args.chunked,
+                          manifest=args.crawl)
+    print(f"共 {len(movies)} 部电影，{len(stages)} 个阶段" + ("（演练模式）" if args.dry_run else ""))
+    start = time.time()
+    results = PipelineRunner(stages, state, args.jobs, args.model_jobs, args.force, args.dry_run).run()
+
+    summary = {}
+    for status, _ in results.values():
+        summary[status] = summary.get(status, 0) + 1
+    print(f"\n完成，耗时 {time.time() - start:.1f} 秒：" + "，".join(f"{k} {v} 个" for k, v in summary.items()))
+    if summary.get('失败') or summary.get('未执行'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+
+# ----------------- 令牌桶限速器 -----------------
+class TokenBucket:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多积攒 capacity 个（允许的突发请求数），可在多个线程间共享
+    """
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("rate 必须大于 0")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """预支一个令牌，返回需要等待的秒数（令牌可以为负，保证先到先得）"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+# ----------------- 按域名限速 -----------------
+class HostRateLimiter:
+    """每个域名一个令牌桶，同一域名下的所有请求共享同一个每秒请求预算"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        self.bucket(url).acquire()
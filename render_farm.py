@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import matplotlib
+
+matplotlib.use("Agg")  # 无显示环境也能出图，绝不弹窗阻塞批量任务
+
+import matplotlib.pyplot as plt
+import pandas as pd
+from matplotlib import font_manager
+from matplotlib.font_manager import FontProperties
+
+DATA_ROOT = './data'
+FONT_CACHE_PATH = './cache/cjk_font.json'
+FONT_ENV = 'DOUBAN_CJK_FONT'   # 可以用环境变量直接指定中文字体文件
+
+# 按顺序尝试的字体文件
+FONT_CANDIDATES = [
+    'C:/Windows/Fonts/simsun.ttc',
+    'C:/Windows/Fonts/simhei.ttf',
+    'C:/Windows/Fonts/msyh.ttc',
+    '/System/Library/Fonts/STHeiti Light.ttc',
+    '/System/Library/Fonts/STSong.ttc',
+    '/System/Library/Fonts/PingFang.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+]
+# 以上文件都不存在时，在 matplotlib 已知的字体中按名称查找
+CJK_FAMILY_HINTS = ('SimSun', 'SimHei', 'Microsoft YaHei', 'PingFang', 'Heiti', 'Songti', 'STSong',
+                    'Hiragino Sans GB', 'Noto Sans CJK', 'Noto Serif CJK', 'Source Han',
+                    'WenQuanYi', 'AR PL')
+
+# 输入文件 -> 输出图片
+WORDCLOUD_INPUT = 'word_frequencies.csv'
+KEYWORDS_INPUT = 'comment_keywords.csv'
+OVERALL_INPUT = 'overall_word_frequencies.csv'
+WORDCLOUD_MAX_WORDS = 250
+OVERALL_MAX_WORDS = 200
+
+
+# ----------------- 中文字体 -----------------
+def _find_cjk_font():
+    env_path = os.environ.get(FONT_ENV)
+    if env_path and os.path.exists(env_path):
+        return env_path
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    for entry in font_manager.fontManager.ttflist:
+        if any(hint.lower() in entry.name.lower() for hint in CJK_FAMILY_HINTS):
+            return entry.fname
+    return None
+
+
+@lru_cache(maxsize=None)
+def resolve_cjk_font(cache_path=FONT_CACHE_PATH):
+    """
+    返回中文字体文件路径，找不到时返回 None。只检查文件是否存在，不做任何试绘；
+    结果保存在 cache/cjk_font.json，之后的进程直接读取（文件被删除或环境变量改变时重新查找）
+    """
+    env_path = os.environ.get(FONT_ENV)
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        path = cached.get('path')
+        if cached.get('env') == env_path and path and os.path.exists(path):
+            return path
+
+    path = _find_cjk_font()
+    if path is None:
+        print("警告：未找到中文字体，图中的中文可能无法显示，可通过环境变量 DOUBAN_CJK_FONT 指定字体文件")
+        return None
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump({'path': path, 'env': env_path}, f, ensure_ascii=False)
+    return path
+
+
+def cjk_font():
+    path = resolve_cjk_font()
+    return FontProperties(fname=path) if path else FontProperties()
+
+
+# ----------------- 各类图表 -----------------
+def render_wordcloud(frequencies, out_path, max_words, figure_dpi=None):
+    """figure_dpi 为 None 时直接保存词云位图，否则放进 matplotlib 图中按该 dpi 保存"""
+    from wordcloud import WordCloud
+
+    wc = WordCloud(
+        background_color='white',
+        width=1000,
+        height=800,
+        font_path=resolve_cjk_font(),
+        max_words=max_words
+    )
+    wc.generate_from_frequencies(frequencies)
+    if figure_dpi is None:
+        wc.to_file(out_path)
+        return
+    fig = plt.figure(figsize=(12, 9))
+    plt.imshow(wc, interpolation="bilinear")
+    plt.axis("off")
+    plt.tight_layout()
+    fig.savefig(out_path, dpi=figure_dpi)
+    plt.close(fig)
+
+
+def render_bars(words, values, out_path, title, ylabel, figsize, dpi=None):
+    font = cjk_font()
+    fig = plt.figure(figsize=figsize)
+    plt.bar(words, values, width=0.5, color=plt.cm.viridis(range(len(words))))
+    plt.xticks(rotation=45, ha='right', fontproperties=font)
+    plt.yticks(fontsize=12)
+    plt.ylabel(ylabel, fontproperties=font, fontsize=12)
+    plt.title(title, fontproperties=font, fontsize=14)
+    plt.grid(axis='y', linestyle='--', alpha=0.5)
+    plt.tight_layout()
+    fig.savefig(out_path, dpi=dpi)
+    plt.close(fig)
+
+
+def render_job(job):
+    """在工作进程中执行一个渲染任务，返回 (输出路径, 错误信息)；单个任务失败不影响其他任务"""
+    kind, in_path, out_path, title = job
+    try:
+        if kind == 'movie_wordcloud':
+            df = pd.read_csv(in_path, encoding='utf-8-sig', keep_default_na=False)
+            render_wordcloud(dict(zip(df['word'], df['weight'])), out_path, WORDCLOUD_MAX_WORDS)
+        elif kind == 'movie_frequencies':
+            df = pd.read_csv(in_path, encoding='utf-8-sig', keep_default_na=False).head(50)
+            render_bars(df['word'], df['count'], out_path, title, "出现次数", (15, 8))
+        elif kind == 'keywords':
+            df = pd.read_csv(in_path, encoding='utf-8-sig', keep_default_na=False, index_col=0).head(30)
+            column = df.columns[0]
+            render_bars(df.index, df[column], out_path, title,
+                        "TF-IDF 得分" if column == 'score' else "出现次数", (12, 6))
+        elif kind == 'overall_wordcloud':
+            df = pd.read_csv(in_path, encoding='utf-8-sig', keep_default_na=False)
+            render_wordcloud(dict(zip(df['word'], df['count'])), out_path, OVERALL_MAX_WORDS, figure_dpi=300)
+        elif kind == 'overall_frequencies':
+            df = pd.read_csv(in_path, encoding='utf-8-sig', keep_default_na=False).head(50)
+            render_bars(df['word'], df['count'], out_path, title, "出现次数", (16, 8), dpi=400)
+        else:
+            raise ValueError(f"未知的渲染任务：{kind}")
+    except Exception as e:
+        return out_path, f"{type(e).__name__}: {e}"
+    return out_path, None
+
+
+# ----------------- 任务收集 -----------------
+def chart_jobs(movie_name, root, files):
+    """目录 root 中的词频文件（files 为其中的文件名）对应的渲染任务，图片输出到同一目录"""
+    jobs = []
+    if WORDCLOUD_INPUT in files:
+        in_path = os.path.join(root, WORDCLOUD_INPUT)
+        jobs.append(('movie_wordcloud', in_path, os.path.join(root, 'wordcloud.png'), None))
+        jobs.append(('movie_frequencies', in_path, os.path.join(root, 'word_frequencies.png'),
+                     f"{movie_name} 母女关系词云词频统计（前50）"))
+    if KEYWORDS_INPUT in files:
+        jobs.append(('keywords', os.path.join(root, KEYWORDS_INPUT), os.path.join(root, 'comment_keywords.png'),
+                     f"{movie_name} 评论主题词前30"))
+    return jobs
+
+
+def movie_jobs(movie_name, base_dir=DATA_ROOT):
+    """在电影目录（含整理后的子文件夹）中查找词频文件"""
+    jobs = []
+    for root, _, files in os.walk(os.path.join(base_dir, movie_name)):
+        jobs.extend(chart_jobs(movie_name, root, files))
+    return jobs
+
+
+def overall_jobs(in_path=OVERALL_INPUT):
+    if not os.path.exists(in_path):
+        return []
+    out_dir = os.path.dirname(in_path)
+    return [
+        ('overall_wordcloud', in_path, os.path.join(out_dir, 'overall_keywords.png'), None),
+        ('overall_frequencies', in_path, os.path.join(out_dir, 'overall_word_frequencies.png'),
+         "总体词频统计（前 50）"),
+    ]
+
+
+def is_stale(job):
+    _, in_path, out_path, _ = job
+    return not os.path.exists(out_path) or os.path.getmtime(out_path) < os.path.getmtime(in_path)
+
+
+def render_all(jobs, workers=None, force=False):
+    """用进程池并行渲染；默认跳过图片比词频文件新的任务。返回 [(输出路径, 错误信息)]"""
+    jobs = [job for job in jobs if force or is_stale(job)]
+    if not jobs:
+        return []
+    resolve_cjk_font()  # 先在主进程解析并写入缓存，工作进程直接读取
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        return [render_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_job, jobs))
+
+
+# ----------------- 主程序 -----------------
+def main():
+    parser = argparse.ArgumentParser(description="根据分析阶段保存的词频文件批量渲染词云与柱状图（无界面，多进程）")
+    parser.add_argument("movies", nargs="*", help="只渲染这些电影，默认 data 目录下的全部电影")
+    parser.add_argument("--workers", type=int, help="进程数（默认为 CPU 核数）")
+    parser.add_argument("--force", action="store_true", help="重新渲染全部图片，不跳过已是最新的图片")
+    parser.add_argument("--no-overall", action="store_true", help="不渲染跨影片汇总的图表")
+    parser.add_argument("--overall-only", action="store_true", help="只渲染跨影片汇总的图表")
+    args = parser.parse_args()
+
+    movies = args.movies
+    if args.overall_only:
+        movies = []
+    elif not movies and os.path.exists(DATA_ROOT):
+        movies = sorted(name for name in os.listdir(DATA_ROOT) if os.path.isdir(os.path.join(DATA_ROOT, name)))
+    jobs = [job for movie in movies for job in movie_jobs(movie)]
+    if not args.no_overall:
+        jobs.extend(overall_jobs())
+    if not jobs:
+        print("没有找到词频文件，请先运行 wordcloud_gen.py / sentiment_topic_analysis.py / overall.py")
+        return
+
+    print(f"中文字体：{resolve_cjk_font() or '未找到'}")
+    results = render_all(jobs, args.workers, args.force)
+    failed = [(path, error) for path, error in results if error]
+    for path, error in failed:
+        print(f"[失败] {path}：{error}")
+    print(f"共 {len(jobs)} 个图表，渲染 {len(results) - len(failed)} 个，"
+          f"跳过 {len(jobs) - len(results)} 个（已是最新），失败 {len(failed)} 个")
+
+
+if __name__ == '__main__':
+    main()
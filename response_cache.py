@@ -0,0 +1,91 @@
+import gzip
+import hashlib
+import json
+import os
+import time as t
+
+CACHE_DIR = './cache/http'
+DEFAULT_TTL = 24 * 3600  # 缓存有效期（秒）
+
+
+class CacheMiss(KeyError):
+    """回放模式下请求的页面不在缓存中"""
+
+
+# ----------------- 响应缓存 -----------------
+class ResponseCache:
+    """
+    原始响应的磁盘缓存：以 URL 的 sha256 为键，gzip 压缩保存，
+    文件按哈希前两位分目录，避免单个目录下文件过多
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def path(self, url):
+        key = self.key(url)
+        return os.path.join(self.cache_dir, key[:2], key + '.json.gz')
+
+    def _load(self, path):
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, EOFError, json.JSONDecodeError):
+            # 写到一半的缓存文件当作不存在
+            return None
+
+    def get(self, url, ignore_ttl=False):
+        """返回缓存的页面文本；不存在或已过期时返回 None"""
+        entry = self._load(self.path(url))
+        if entry is None or entry['url'] != url:
+            return None
+        if not ignore_ttl and self.ttl is not None and t.time() - entry['fetched_at'] > self.ttl:
+            return None
+        return entry['text']
+
+    def put(self, url, text):
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {'url': url, 'fetched_at': t.time(), 'text': text}
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def delete(self, url):
+        try:
+            os.remove(self.path(url))
+        except FileNotFoundError:
+            pass
+
+    def iter_entries(self):
+        """遍历所有缓存条目，产出 (url, text)，可作为离线解析测试与基准的素材"""
+        if not os.path.exists(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in sorted(files):
+                if not filename.endswith('.json.gz'):
+                    continue
+                entry = self._load(os.path.join(root, filename))
+                if entry is not None:
+                    yield entry['url'], entry['text']
+
+    def purge_expired(self):
+        """删除所有过期条目，返回删除数量"""
+        removed = 0
+        if self.ttl is None or not os.path.exists(self.cache_dir):
+            return removed
+        now = t.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                entry = self._load(path)
+                if entry is None or now - entry['fetched_at'] > self.ttl:
+                    os.remove(path)
+                    removed += 1
+        return removed
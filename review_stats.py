@@ -0,0 +1,198 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from comment_parser import TIME_FORMAT
+
+STATS_FILE = 'rating_stats.json'
+PERCENTILES = (25, 50, 75, 90, 99)
+DEFAULT_UPVOTE = 1   # 长评和小红书内容没有点赞数，按 1 计权重（与原 stastic_star 一致）
+
+# 豆瓣短评的好评 / 中评 / 差评分类，与抓取时的 percent_type 参数相同
+PERCENT_TYPES = ("h", "m", "l", "unrated")
+PERCENT_TYPE_LABELS = {"h": "好评", "m": "中评", "l": "差评", "unrated": "未评分"}
+# 星级 -> percent_type 编码（下标为星级，0 表示未评分）
+STAR_TO_TYPE = np.array([3, 2, 2, 1, 0, 0], dtype=np.int8)
+
+
+def _to_numeric(values, default):
+    """字符串 / 数字混合的列一次性转成整数数组，缺失或无法解析的值用 default 代替"""
+    parsed = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+    return parsed.fillna(default).to_numpy(dtype=np.int64)
+
+
+def _float(value):
+    """numpy 标量转成可写入 JSON 的 float，NaN 写成 null"""
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
+
+
+# ----------------- 列式数据 -----------------
+class ReviewColumns:
+    """
+    评论的列式表示：星级、点赞数、时间、percent_type、来源都在构造时解析一次，
+    保存为 NumPy 数组，之后的所有统计都是数组运算
+    """
+
+    def __init__(self, stars, upvotes, times, types, source_codes, source_labels):
+        self.stars = stars                  # int8，0 表示未评分
+        self.upvotes = upvotes              # int64
+        self.times = times                  # datetime64[s]，缺失为 NaT
+        self.has_time = ~np.isnat(times)
+        # 月份编号（自 1970-01 起），按月统计时不必再做日期换算
+        self.months = times[self.has_time].astype('datetime64[M]').astype(np.int64)
+        self.types = types                  # int8，PERCENT_TYPES 的下标
+        self.source_codes = source_codes    # int32，source_labels 的下标
+        self.source_labels = source_labels
+
+    @classmethod
+    def from_comments(cls, comments, sources=None):
+        """
+        comments: 评论字典列表（short_reviews.json / long_reviews.json / 小红书等格式）
+        sources: 与 comments 一一对应的来源名称，不传时全部记为“全部”
+        """
+        stars = _to_numeric([c.get('stars') for c in comments], 0)
+        stars = np.where((stars >= 1) & (stars <= 5), stars, 0).astype(np.int8)
+        upvotes = _to_numeric([c.get('upvote') for c in comments], DEFAULT_UPVOTE)
+        times = pd.to_datetime(pd.Series([c.get('time') for c in comments], dtype=object),
+                               format=TIME_FORMAT, errors='coerce').to_numpy(dtype='datetime64[s]')
+
+        # 评论自带 percent_type 时直接使用，否则按星级推断
+        types = STAR_TO_TYPE[stars]
+        explicit = pd.Series([c.get('percent_type') for c in comments], dtype=object)
+        explicit = explicit.map({t: i for i, t in enumerate(PERCENT_TYPES)}).to_numpy(dtype=np.float64)
+        known = ~np.isnan(explicit)
+        types[known] = explicit[known]
+
+        if sources is None:
+            sources = ["全部"] * len(comments)
+        source_codes, source_labels = pd.factorize(pd.Series(sources, dtype=object))
+        return cls(stars, upvotes, times, types, source_codes.astype(np.int32), list(source_labels))
+
+    def __len__(self):
+        return len(self.stars)
+
+
+# ----------------- 统计 -----------------
+STAR_VALUES = np.arange(6)
+
+
+def hist_percentiles(hist, values, qs=PERCENTILES):
+    """
+    直接由直方图算分位数，结果与对展开后的数据调用 np.percentile（线性插值）相同，
+    星级只有 5 种取值，不需要对百万级数组排序
+    """
+    n = hist.sum()
+    if not n:
+        return {}
+    cumulative = np.cumsum(hist)
+    position = np.asarray(qs, dtype=np.float64) / 100 * (n - 1)
+    lower = np.floor(position)
+    low_values = values[np.searchsorted(cumulative, lower, side='right')]
+    high_values = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+    result = low_values + (high_values - low_values) * (position - lower)
+    return {f"p{q}": _float(v) for q, v in zip(qs, result)}
+
+
+def star_tables(codes, n_groups, stars, upvotes):
+    """
+    两次 bincount 得到每组的 (星级分布, 各星级的点赞数之和)，形状都是 (n_groups, 6)，
+    第 0 列为未评分；条数、平均星级、点赞加权平均等都可以由这两张表算出
+    """
+    keys = codes * 6 + stars
+    hist = np.bincount(keys, minlength=n_groups * 6).reshape(n_groups, 6)
+    upvote_hist = np.bincount(keys, weights=upvotes, minlength=n_groups * 6).reshape(n_groups, 6)
+    return hist, upvote_hist
+
+
+def summarize_tables(hist, upvote_hist):
+    """每组的条数、有星级的条数、平均星级、点赞加权平均星级（sum(星级 × 点赞) / sum(点赞)）和点赞数"""
+    count = hist.sum(axis=1)
+    rated = hist[:, 1:].sum(axis=1)
+    upvote_total = upvote_hist.sum(axis=1)
+    rated_upvotes = upvote_hist[:, 1:].sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = hist @ STAR_VALUES / rated
+        weighted_mean = upvote_hist @ STAR_VALUES / rated_upvotes
+        upvote_mean = upvote_total / count
+    return count, rated, mean, weighted_mean, upvote_total, upvote_mean
+
+
+def star_summary(stars, upvotes):
+    hist = np.bincount(stars, minlength=6)[np.newaxis]
+    upvote_hist = np.bincount(stars, weights=upvotes, minlength=6)[np.newaxis]
+    _, rated, mean, weighted_mean, _, _ = summarize_tables(hist, upvote_hist)
+    return {
+        "rated": int(rated[0]),
+        "histogram": {str(star): int(n) for star, n in enumerate(hist[0, 1:], 1)},
+        "mean": _float(mean[0]),
+        "weighted_mean": _float(weighted_mean[0]),
+        "percentiles": hist_percentiles(hist[0, 1:], STAR_VALUES[1:]),
+    }
+
+
+def upvote_summary(upvotes):
+    return {
+        "total": int(upvotes.sum()),
+        "mean": _float(upvotes.mean()) if len(upvotes) else None,
+        "percentiles": {f"p{q}": _float(v) for q, v in zip(PERCENTILES, np.percentile(upvotes, PERCENTILES))}
+        if len(upvotes) else {},
+    }
+
+
+def time_summary(times, has_time, months):
+    if not len(months):
+        return {"first": None, "last": None, "by_month": {}}
+    # 按月计数：月份编号减去最早的月份后 bincount，避免对时间排序
+    first_month = months.min()
+    counts = np.bincount(months - first_month)
+    valid = times[has_time]
+    return {
+        "first": str(valid.min()).replace('T', ' '),
+        "last": str(valid.max()).replace('T', ' '),
+        "by_month": {str(np.datetime64(int(first_month + i), 'M')): int(n)
+                     for i, n in enumerate(counts) if n},
+    }
+
+
+def group_summary(codes, labels, stars, upvotes):
+    """按分组编码一次性算出每组的条数、星级分布、平均星级、点赞加权平均星级和点赞数"""
+    hist, upvote_hist = star_tables(codes, len(labels), stars, upvotes)
+    count, rated, mean, weighted_mean, upvote_total, upvote_mean = summarize_tables(hist, upvote_hist)
+    result = {}
+    for i, label in enumerate(labels):
+        if not count[i]:
+            continue
+        result[label] = {
+            "count": int(count[i]),
+            "share": _float(count[i] / len(codes)),
+            "rated": int(rated[i]),
+            "histogram": {str(star): int(n) for star, n in enumerate(hist[i, 1:], 1)},
+            "mean": _float(mean[i]),
+            "weighted_mean": _float(weighted_mean[i]),
+            "upvotes_total": int(upvote_total[i]),
+            "upvotes_mean": _float(upvote_mean[i]),
+        }
+    return result
+
+
+def compute_stats(columns):
+    return {
+        "comments": len(columns),
+        "stars": star_summary(columns.stars, columns.upvotes),
+        "upvotes": upvote_summary(columns.upvotes),
+        "time": time_summary(columns.times, columns.has_time, columns.months),
+        "by_percent_type": group_summary(columns.types, [PERCENT_TYPE_LABELS[t] for t in PERCENT_TYPES],
+                                         columns.stars, columns.upvotes),
+        "by_source": group_summary(columns.source_codes, columns.source_labels, columns.stars, columns.upvotes),
+    }
+
+
+def save_stats(stats, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import jieba
+import jieba.analyse
+
+SEGMENT_STORE_PATH = './cache/segments.sqlite3'
+TOP_K = 20         # 每条评论保留的关键词个数，与各分析脚本原来的 extract_tags(topK=20) 一致
+QUERY_CHUNK = 500  # SQLite 单条语句的参数个数有限，分块查询
+CHUNK_CHARS = 200_000   # 多进程分词时每个任务包含的最大字符数
+MIN_PARALLEL_CHARS = 500_000  # 总字符数低于该值时进程池的启动开销不划算，直接在本进程内分词
+
+
+# ----------------- 缓存键 -----------------
+@lru_cache(maxsize=None)
+def dictionary_version():
+    """jieba 版本、主词典与 IDF 词典内容的哈希，换词典后旧的分词结果自动失效"""
+    package_dir = os.path.dirname(jieba.__file__)
+    dict_path = getattr(getattr(jieba, 'dt', None), 'dictionary', None) or os.path.join(package_dir, 'dict.txt')
+    idf_path = os.path.join(package_dir, 'analyse', 'idf.txt')
+
+    digest = hashlib.sha256(getattr(jieba, '__version__', '').encode('utf-8'))
+    for path in (dict_path, idf_path):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return f"{digest.hexdigest()[:16]}#top_k={TOP_K}"
+
+
+def segment_key(text, version):
+    return hashlib.sha256(f"{version}\x1f{text}".encode('utf-8')).hexdigest()
+
+
+def jieba_stop_words():
+    """extract_tags 过滤用的 jieba 停用词（jieba.analyse.set_stop_words 设置后也会反映在这里）"""
+    if hasattr(jieba.analyse, 'default_tfidf'):
+        return jieba.analyse.default_tfidf.stop_words
+    # 旧版 jieba 没有 default_tfidf，停用词是模块级的 STOP_WORDS
+    return getattr(jieba.analyse, 'STOP_WORDS', frozenset())
+
+
+def tags_from_tokens(tokens, top_k=TOP_K):
+    """
+    用已有的分词结果按 TF-IDF 取关键词，算法与 jieba.analyse.extract_tags 完全一致，
+    省去 extract_tags 内部的第二次分词
+    """
+    tfidf = jieba.analyse.default_tfidf
+    freq = {}
+    for w in tokens:
+        if len(w.strip()) < 2 or w.lower() in tfidf.stop_words:
+            continue
+        freq[w] = freq.get(w, 0.0) + 1.0
+    total = sum(freq.values())
+    for k in freq:
+        freq[k] *= tfidf.idf_freq.get(k, tfidf.median_idf) / total
+    return sorted(freq, key=freq.__getitem__, reverse=True)[:top_k]
+
+
+def segment_text(text):
+    """返回 (分词结果, 关键词)，关键词与 jieba.analyse.extract_tags(text, topK=20) 相同"""
+    tokens = jieba.lcut(text)
+    if hasattr(jieba.analyse, 'default_tfidf'):
+        return tokens, tags_from_tokens(tokens)
+    # 旧版 jieba 没有 default_tfidf，直接调用 extract_tags
+    return tokens, jieba.analyse.extract_tags(text, topK=TOP_K, withWeight=False)
+
+
+# ----------------- 多进程分词 -----------------
+def _init_worker():
+    # 每个工作进程只加载一次词典
+    jieba.setLogLevel(logging.WARNING)
+    jieba.initialize()
+
+
+def _segment_chunk(texts):
+    return [segment_text(text) for text in texts]
+
+
+def chunk_by_chars(texts, chunk_chars=CHUNK_CHARS):
+    """按字符数而不是条数切块，长评和短评混在一起时各任务的工作量也大致相同"""
+    chunk = []
+    size = 0
+    for text in texts:
+        if chunk and size + len(text) > chunk_chars:
+            yield chunk
+            chunk = []
+            size = 0
+        chunk.append(text)
+        size += len(text)
+    if chunk:
+        yield chunk
+
+
+def segment_parallel(texts, workers=None, chunk_chars=CHUNK_CHARS):
+    """
+    用进程池并行分词 + 提取关键词，返回 [(tokens, tags)]，顺序与 texts 一致
+    workers: 进程数，默认为 CPU 核数；文本总量较小或只有一个核时在本进程内处理
+    """
+    texts = list(texts)
+    workers = workers or os.cpu_count() or 1
+    total_chars = sum(len(text) for text in texts)
+    if workers == 1 or total_chars < MIN_PARALLEL_CHARS:
+        return _segment_chunk(texts)
+
+    # 保证每个进程至少分到几块，避免最后只剩一个进程在处理最大的那块
+    chunk_chars = max(1, min(chunk_chars, total_chars // (workers * 4)))
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # map 按提交顺序返回结果，输出顺序是确定的
+        for part in pool.map(_segment_chunk, chunk_by_chars(texts, chunk_chars)):
+            results.extend(part)
+    return results
+
+
+# ----------------- 分词缓存 -----------------
+class SegmentStore:
+    """持久化保存每条评论内容的分词与关键词（SQLite），所有分析脚本共用"""
+
+    def __init__(self, path=SEGMENT_STORE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            "key TEXT PRIMARY KEY, tokens TEXT NOT NULL, tags TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys):
+        """返回 {key: (tokens, tags)}，不存在的键不出现在结果中"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), QUERY_CHUNK):
+                chunk = keys[start:start + QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, tokens, tags FROM segments WHERE key IN ({placeholders})", chunk
+                )
+                for key, tokens, tags in rows:
+                    found[key] = (json.loads(tokens), json.loads(tags))
+        return found
+
+    def put_many(self, items):
+        """items: [(key, tokens, tags)]"""
+        rows = [(key, json.dumps(tokens, ensure_ascii=False), json.dumps(tags, ensure_ascii=False))
+                for key, tokens, tags in items]
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO segments VALUES (?, ?, ?)", rows)
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def segment_texts(texts, store=None, compute=None):
+    """
+    批量分词 + 提取关键词，每种评论内容只用 jieba 处理一次：
+    先查缓存，未命中的内容（同一批内去重）交给 compute 处理后写回缓存
+    store: 不传时临时打开默认缓存文件
+    compute: 接收文本列表、返回 [(tokens, tags)] 的函数，默认用 segment_parallel 多进程处理
+    返回 [(tokens, tags)]，与 texts 一一对应
+    """
+    own_store = store is None
+    if own_store:
+        store = SegmentStore()
+    try:
+        version = dictionary_version()
+        keys = [segment_key(text, version) for text in texts]
+        cached = store.get_many(keys)
+
+        missing = {}
+        for text, key in zip(texts, keys):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            outputs = (compute or segment_parallel)(list(missing.values()))
+            fresh = {key: (list(tokens), list(tags)) for key, (tokens, tags) in zip(missing, outputs)}
+            store.put_many([(key, tokens, tags) for key, (tokens, tags) in fresh.items()])
+            cached.update(fresh)
+        return [cached[key] for key in keys]
+    finally:
+        if own_store:
+            store.close()
+
+
+def extract_tags_cached(texts, store=None, compute=None):
+    """只需要关键词时使用，返回 [tags]"""
+    return [tags for _, tags in segment_texts(texts, store, compute)]
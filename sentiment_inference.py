@@ -0,0 +1,292 @@
+import json
+import os
+import re
+from functools import lru_cache
+
+from sentiment_store import settings_tag, result_key
+
+MODEL_NAME = "IDEA-CCNL/Erlangshen-Roberta-330M-Sentiment"
+MODEL_REVISION = "main"  # 要使用的分支 / 标签 / commit 哈希，实际使用的版本见 pinned_revision()
+MODEL_LOCK_PATH = './cache/model_revision.json'
+MAX_CHARS = 128          # 每条评论只取前 128 个字符送入模型
+DEFAULT_BATCH_SIZE = 32
+WINDOW_TOKENS = 128      # 分窗模式下每个窗口的 token 数（不含 [CLS]/[SEP]）
+WINDOW_OVERLAP = 32      # 相邻窗口重叠的 token 数
+
+BACKENDS = ("fp32", "int8", "onnx")
+DEFAULT_BACKEND = "fp32"
+ONNX_DIR = './cache/onnx'  # 导出的 ONNX 模型保存位置，只在第一次使用时导出
+
+
+# ----------------- 模型版本 -----------------
+def _resolve_commit(model_name, revision):
+    """把分支 / 标签解析成 commit 哈希：优先询问 Hub，离线时读取本地 HF 缓存中记录的 refs"""
+    try:
+        from huggingface_hub import HfApi
+        return HfApi().model_info(model_name, revision=revision).sha
+    except Exception as e:
+        from huggingface_hub.constants import HF_HUB_CACHE
+        ref_path = os.path.join(HF_HUB_CACHE, f"models--{model_name.replace('/', '--')}", "refs", revision)
+        if os.path.exists(ref_path):
+            with open(ref_path, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        raise RuntimeError(f"无法把 {model_name}@{revision} 解析成 commit 哈希（{e}），"
+                           f"请联网运行一次，或把 MODEL_REVISION 直接设为 commit 哈希") from e
+
+
+@lru_cache(maxsize=None)
+def pinned_revision(model_name=MODEL_NAME, revision=MODEL_REVISION):
+    """
+    实际加载的模型 commit。MODEL_REVISION 本身是 commit 哈希时直接使用；是分支或标签（如 main）时，
+    第一次使用时解析成当时的 commit 并记录在 MODEL_LOCK_PATH，之后加载模型和情感结果缓存都固定用这个哈希，
+    上游更新 main 不会悄悄换掉模型、也不会让旧的缓存结果冒充新模型的结果。
+    要升级到新版本，删除该文件（或修改 MODEL_REVISION）即可
+    """
+    if re.fullmatch(r'[0-9a-f]{40}', revision):
+        return revision
+    locks = {}
+    if os.path.exists(MODEL_LOCK_PATH):
+        with open(MODEL_LOCK_PATH, 'r', encoding='utf-8') as f:
+            locks = json.load(f)
+    key = f"{model_name}@{revision}"
+    if key not in locks:
+        locks[key] = _resolve_commit(model_name, revision)
+        os.makedirs(os.path.dirname(MODEL_LOCK_PATH) or '.', exist_ok=True)
+        tmp_path = MODEL_LOCK_PATH + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(locks, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, MODEL_LOCK_PATH)
+        print(f"模型版本已固定：{key} -> {locks[key]}（记录在 {MODEL_LOCK_PATH}）")
+    return locks[key]
+
+
+# ----------------- 推理后端 -----------------
+def onnx_export_dir():
+    return os.path.join(ONNX_DIR, f"{MODEL_NAME.replace('/', '__')}@{pinned_revision()}")
+
+
+def load_tokenizer():
+    """
+    单独的分词器实例。HF 的 fast tokenizer 不能在两个线程中以不同的截断 / padding 设置同时使用，
+    流水线的预处理线程用自己的实例，不与推理线程中 pipeline 的分词器共用
+    """
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(MODEL_NAME, revision=pinned_revision())
+
+
+def build_classifier(backend=DEFAULT_BACKEND, threads=None):
+    """
+    构建情感分类 pipeline，三种 CPU 后端可选：
+      fp32 - 原始 PyTorch 模型
+      int8 - PyTorch 动态量化（Linear 层权重转为 int8）
+      onnx - 导出为 ONNX 后由 ONNX Runtime 推理（需要安装 optimum[onnxruntime]）
+    threads: 推理线程数，不指定时使用框架默认值
+    可选依赖只在选中对应后端时才导入
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的推理后端：{backend}，可选 {', '.join(BACKENDS)}")
+
+    from transformers import pipeline
+    tokenizer = load_tokenizer()
+
+    if backend == "onnx":
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        export_dir = onnx_export_dir()
+        if os.path.exists(export_dir):
+            model = ORTModelForSequenceClassification.from_pretrained(export_dir, session_options=options)
+        else:
+            model = ORTModelForSequenceClassification.from_pretrained(
+                MODEL_NAME, revision=pinned_revision(), export=True, session_options=options
+            )
+            model.save_pretrained(export_dir)
+    else:
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        if threads:
+            torch.set_num_threads(threads)
+        model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, revision=pinned_revision())
+        model.eval()
+        if backend == "int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+
+@lru_cache(maxsize=None)
+def get_classifier(backend=DEFAULT_BACKEND, threads=None):
+    """同一进程内分析多部电影时复用已加载的模型"""
+    return build_classifier(backend, threads)
+
+
+# ----------------- 批量推理 -----------------
+def encode_batches(tokenizer, inputs, batch_size=DEFAULT_BATCH_SIZE, lengths=None):
+    """
+    按 token 长度排序后分批编码成模型输入（批内 padding 到最长），让同一批次内的文本长度接近、padding 最少
+    不传 lengths 时每条文本只分词一次：按这次编码的 token 数排序，各批直接对已有编码做 padding；
+    传入 lengths 时（分窗推理已知每个窗口的 token 数）按其排序后逐批编码
+    返回 [(批内各文本的原始下标, 模型输入)]
+    """
+    if not inputs:
+        return []
+    if lengths is None:
+        encoded = tokenizer(list(inputs), truncation=True)
+        features = [dict(zip(encoded.keys(), values)) for values in zip(*encoded.values())]
+        lengths = [len(feature["input_ids"]) for feature in features]
+
+        def encode(batch_index):
+            return tokenizer.pad([features[i] for i in batch_index], return_tensors="pt")
+    else:
+        def encode(batch_index):
+            return tokenizer([inputs[i] for i in batch_index], padding=True, truncation=True, return_tensors="pt")
+
+    order = sorted(range(len(inputs)), key=lambda i: lengths[i])
+    return [(order[start:start + batch_size], encode(order[start:start + batch_size]))
+            for start in range(0, len(order), batch_size)]
+
+
+def classify_encoded(classifier, encoded):
+    """
+    对已经编码好的一批输入直接调用模型，softmax 后取概率最大的标签（与 sentiment-analysis pipeline 的后处理相同）
+    不经过 pipeline 的分词器。返回 [(sentiment, score)]，sentiment 为 "positive" / "negative"
+    """
+    import torch
+
+    model = classifier.model
+    with torch.no_grad():
+        logits = model(**encoded).logits
+    scores, label_ids = torch.softmax(logits.float(), dim=-1).max(dim=-1)
+    id2label = model.config.id2label
+    return [("positive" if id2label[i].lower() == "positive" else "negative", score)
+            for score, i in zip(scores.tolist(), label_ids.tolist())]
+
+
+def classify_batches(classifier, batches, n_inputs):
+    """对 encode_batches 的结果逐批推理，按原始顺序还原。返回 [(sentiment, score)]"""
+    results = [None] * n_inputs
+    for batch_index, encoded in batches:
+        for i, result in zip(batch_index, classify_encoded(classifier, encoded)):
+            results[i] = result
+    return results
+
+
+def classify_batched(classifier, inputs, batch_size=DEFAULT_BATCH_SIZE, lengths=None):
+    """按长度分批编码并推理，推理完成后再按原始顺序还原。返回 [(sentiment, score)]"""
+    batches = encode_batches(classifier.tokenizer, inputs, batch_size, lengths)
+    return classify_batches(classifier, batches, len(inputs))
+
+
+def classify_texts(classifier, texts, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    批量情感分类，文本截断规则与逐条调用时一致（前 MAX_CHARS 个字符）
+    返回 [(sentiment, score)]
+    """
+    truncated = [text[:MAX_CHARS] for text in texts]
+    if not truncated:
+        return []
+    return classify_batched(classifier, truncated, batch_size)
+
+
+# ----------------- 长文本分窗推理 -----------------
+def split_windows(tokenizer, texts, window=WINDOW_TOKENS, overlap=WINDOW_OVERLAP):
+    """
+    把每条文本按 token 切成相互重叠的窗口，窗口边界按分词器给出的字符偏移还原成原文片段
+    返回 [(文本下标, 窗口文本, 窗口 token 数)]
+    """
+    if not 0 <= overlap < window:
+        raise ValueError(f"窗口重叠 {overlap} 必须小于窗口长度 {window}")
+    step = window - overlap
+
+    encoded = tokenizer(list(texts), add_special_tokens=False, return_offsets_mapping=True)
+    windows = []
+    for i, (text, offsets) in enumerate(zip(texts, encoded["offset_mapping"])):
+        if len(offsets) <= window:
+            windows.append((i, text, max(len(offsets), 1)))
+            continue
+        for start in range(0, len(offsets) - overlap, step):
+            span = offsets[start:start + window]
+            windows.append((i, text[span[0][0]:span[-1][1]], len(span)))
+    return windows
+
+
+def aggregate_windows(windows, outputs, n_texts):
+    """
+    把每条文本的窗口结果按 token 数加权平均正面概率 p_pos（正面时为 score，负面时为 1 - score），
+    p_pos >= 0.5 判为正面。返回 [(sentiment, score)]，score 为所判标签的概率
+    """
+    positive = [0.0] * n_texts
+    weight = [0] * n_texts
+    for (i, _, n_tokens), (sentiment, score) in zip(windows, outputs):
+        positive[i] += (score if sentiment == "positive" else 1 - score) * n_tokens
+        weight[i] += n_tokens
+
+    results = []
+    for p_sum, w in zip(positive, weight):
+        p_pos = p_sum / w
+        results.append(("positive", p_pos) if p_pos >= 0.5 else ("negative", 1 - p_pos))
+    return results
+
+
+def classify_chunked(classifier, texts, batch_size=DEFAULT_BATCH_SIZE,
+                     window=WINDOW_TOKENS, overlap=WINDOW_OVERLAP):
+    """
+    分窗情感分类：所有文本的所有窗口放在一起按长度分批推理（总开销与 token 总数成正比，
+    而不是与文本条数成正比），再按 aggregate_windows 合并为每条文本的结果
+    """
+    if not texts:
+        return []
+    windows = split_windows(classifier.tokenizer, texts, window, overlap)
+    outputs = classify_batched(classifier, [w[1] for w in windows], batch_size, [w[2] for w in windows])
+    return aggregate_windows(windows, outputs, len(texts))
+
+
+# ----------------- 结果缓存 -----------------
+def cache_keys(texts, backend=DEFAULT_BACKEND, chunking=None, model_name=MODEL_NAME, revision=None):
+    """
+    返回 (实际决定结果的文本, 缓存键)：截断模式下只有前 MAX_CHARS 个字符影响结果，分窗模式下全文都影响结果
+    revision 不传时使用固定下来的模型 commit（pinned_revision），缓存键始终对应具体的模型版本
+    """
+    if revision is None:
+        revision = pinned_revision(model_name)
+    tag = settings_tag(model_name, revision, MAX_CHARS, backend, chunking)
+    inputs = list(texts) if chunking else [text[:MAX_CHARS] for text in texts]
+    return inputs, [result_key(text, tag) for text in inputs]
+
+
+def classify_cached(texts, store, load_classifier, batch_size=DEFAULT_BATCH_SIZE,
+                    model_name=MODEL_NAME, revision=None, backend=DEFAULT_BACKEND,
+                    chunking=None, remote=None):
+    """
+    先查情感结果缓存，只把未命中的文本（同一批内去重）送入模型，推理结果写回缓存
+    load_classifier: 无参函数，只在确实存在未命中时才调用，全部命中时不加载模型
+    chunking: None 表示截断模式；(window, overlap) 表示对全文分窗推理
+    remote: 已连接的常驻推理服务（inference_worker.InferenceClient），给出时不在本进程加载模型
+    返回 (results, 实际推理的条数)
+    """
+    inputs, keys = cache_keys(texts, backend, chunking, model_name, revision)
+    cached = store.get_many(keys)
+
+    missing = {}
+    for text, key in zip(inputs, keys):
+        if key not in cached and key not in missing:
+            missing[key] = text
+
+    if missing:
+        if remote is not None:
+            outputs = remote.classify(list(missing.values()), batch_size, chunking)
+        else:
+            classifier = load_classifier()
+            if chunking:
+                outputs = classify_chunked(classifier, list(missing.values()), batch_size, *chunking)
+            else:
+                outputs = classify_texts(classifier, list(missing.values()), batch_size)
+        fresh = dict(zip(missing, outputs))
+        store.put_many([(key, sentiment, score) for key, (sentiment, score) in fresh.items()])
+        cached.update(fresh)
+
+    return [cached[key] for key in keys], len(missing)
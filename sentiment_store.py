@@ -0,0 +1,62 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+STORE_PATH = './cache/sentiment.sqlite3'
+QUERY_CHUNK = 500  # SQLite 单条语句的参数个数有限，分块查询
+
+
+def settings_tag(model_name, revision, max_chars, backend="fp32", chunking=None):
+    """模型名称、版本、截断长度、推理后端与分窗参数共同决定结果，任何一项变化都会让旧结果失效"""
+    tag = f"{model_name}@{revision}#max_chars={max_chars}"
+    # 默认 fp32 后端、不分窗时不写入标签，保持与之前缓存的结果兼容
+    if backend != "fp32":
+        tag += f"#backend={backend}"
+    if chunking:
+        tag += "#window={}/{}".format(*chunking)
+    return tag
+
+
+def result_key(text, tag):
+    """以决定结果的文本（去首尾空白，截断模式下为截断后的文本）加上设置标签的哈希作为键"""
+    return hashlib.sha256(f"{tag}\x1f{text}".encode('utf-8')).hexdigest()
+
+
+# ----------------- 情感结果缓存 -----------------
+class SentimentStore:
+    """持久化保存每条评论的情感结果（SQLite），重复运行时只需要推理新增评论"""
+
+    def __init__(self, path=STORE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment ("
+            "key TEXT PRIMARY KEY, sentiment TEXT NOT NULL, score REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys):
+        """返回 {key: (sentiment, score)}，不存在的键不出现在结果中"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), QUERY_CHUNK):
+                chunk = keys[start:start + QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, sentiment, score FROM sentiment WHERE key IN ({placeholders})", chunk
+                )
+                for key, sentiment, score in rows:
+                    found[key] = (sentiment, score)
+        return found
+
+    def put_many(self, items):
+        """items: [(key, sentiment, score)]"""
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?)", items)
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
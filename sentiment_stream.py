@@ -0,0 +1,231 @@
+import csv
+import json
+import os
+import queue
+import threading
+from collections import Counter
+
+from segment_cache import SegmentStore, segment_texts
+from sentiment_inference import (DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, aggregate_windows, cache_keys,
+                                 classify_batches, encode_batches, load_tokenizer, split_windows)
+
+READ_CHUNK = 1 << 16       # 每次从磁盘读取的字符数
+DEFAULT_BLOCK_SIZE = 512   # 流水线中每个块包含的评论数
+DEFAULT_QUEUE_SIZE = 4     # 相邻阶段之间最多积压的块数，决定了内存上限
+CSV_COLUMNS = ["content", "sentiment", "score"]
+
+_DONE = object()
+
+
+# ----------------- 增量读取 -----------------
+def iter_json_array(path, chunk_size=READ_CHUNK):
+    """
+    逐个产出顶层 JSON 数组中的元素，内存中只保留当前读到的一小段文本，
+    不需要像 json.load 那样一次性把整个文件读进来
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size)
+        pos = 0
+        started = False
+        eof = not buffer
+        while True:
+            # 跳过空白和元素之间的逗号
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    raise ValueError(f"{path} 不是完整的 JSON 数组")
+                buffer, pos = f.read(chunk_size), 0
+                eof = not buffer
+                continue
+
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError(f"{path} 的顶层不是 JSON 数组")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                end = None
+            # 解析失败或者恰好解析到缓冲区末尾（可能是被截断的数字），读入更多内容后重试
+            if (end is None or end == len(buffer)) and not eof:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            if end is None:
+                raise ValueError(f"{path} 中的 JSON 元素不完整")
+            yield item
+            pos = end
+
+
+def iter_text_blocks(path, block_size=DEFAULT_BLOCK_SIZE):
+    """按块产出评论文本（去首尾空白，跳过空评论）"""
+    block = []
+    for comment in iter_json_array(path):
+        text = comment.get("content", "").strip() if isinstance(comment, dict) else ""
+        if text:
+            block.append(text)
+            if len(block) == block_size:
+                yield block
+                block = []
+    if block:
+        yield block
+
+
+# ----------------- 流水线 -----------------
+class SentimentStream:
+    """
+    流式情感分析，四个阶段通过有界队列相连，内存占用与评论总数无关：
+      读取线程：增量解析 JSON，按块产出评论
+      预处理线程：查情感结果缓存，把未命中的评论（或分窗后的窗口）按长度分批编码成模型输入，
+                  同时统计关键词与词频（走分词缓存）
+      推理线程：直接把编码好的输入送入模型，不再分词，结果写回缓存
+      调用线程：按原顺序逐块追加写入 CSV
+    预处理线程使用自己的分词器实例（fast tokenizer 不能被两个线程同时使用）；
+    模型推理时会释放 GIL，因此下一块的编码、关键词提取和写文件可以与推理同时进行
+    """
+
+    def __init__(self, store, load_classifier, batch_size=DEFAULT_BATCH_SIZE, backend=DEFAULT_BACKEND,
+                 chunking=None, remote=None, stopwords=(), block_size=DEFAULT_BLOCK_SIZE,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        self.store = store
+        self.load_classifier = load_classifier
+        self.batch_size = batch_size
+        self.backend = backend
+        self.chunking = chunking
+        self.remote = remote
+        self.stopwords = stopwords
+        self.block_size = block_size
+        self.queue_size = queue_size
+        self.stop = threading.Event()
+        self.segment_store = None
+
+    # -------- 线程间通信 --------
+    def _put(self, q, item):
+        """下游出错退出时不再阻塞在满队列上"""
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run_stage(self, stage, source, sink):
+        def target():
+            try:
+                for item in stage(source):
+                    if not self._put(sink, item):
+                        return
+                self._put(sink, _DONE)
+            except BaseException as e:
+                self._put(sink, e)
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _drain(q):
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    # -------- 各阶段 --------
+    def _prepare(self, blocks):
+        tokenizer = None
+        for texts in blocks:
+            inputs, keys = cache_keys(texts, self.backend, self.chunking)
+            cached = self.store.get_many(keys)
+            missing = {}
+            for text, key in zip(inputs, keys):
+                if key not in cached and key not in missing:
+                    missing[key] = text
+
+            windows = batches = None
+            if missing and self.remote is None:
+                if tokenizer is None:
+                    tokenizer = load_tokenizer()
+                miss_texts = list(missing.values())
+                if self.chunking:
+                    windows = split_windows(tokenizer, miss_texts, *self.chunking)
+                    batches = encode_batches(tokenizer, [w[1] for w in windows], self.batch_size,
+                                             [w[2] for w in windows])
+                else:
+                    batches = encode_batches(tokenizer, miss_texts, self.batch_size)
+
+            keywords = Counter()
+            for _, tags in segment_texts(texts, self.segment_store):
+                keywords.update(k for k in tags if k not in self.stopwords)
+
+            yield texts, keys, cached, missing, windows, batches, keywords
+
+    def _infer(self, prepared_blocks):
+        classifier = None
+        for texts, keys, cached, missing, windows, batches, keywords in prepared_blocks:
+            if missing:
+                miss_texts = list(missing.values())
+                if self.remote is not None:
+                    outputs = self.remote.classify(miss_texts, self.batch_size, self.chunking)
+                else:
+                    # 只有存在未命中的评论时才加载模型；推理线程只调用模型，不使用 pipeline 的分词器
+                    if classifier is None:
+                        classifier = self.load_classifier()
+                    if self.chunking:
+                        window_outputs = classify_batches(classifier, batches, len(windows))
+                        outputs = aggregate_windows(windows, window_outputs, len(miss_texts))
+                    else:
+                        outputs = classify_batches(classifier, batches, len(miss_texts))
+                fresh = dict(zip(missing, outputs))
+                self.store.put_many([(key, sentiment, score) for key, (sentiment, score) in fresh.items()])
+                cached.update(fresh)
+            yield texts, [cached[key] for key in keys], len(missing), keywords
+
+    def run(self, comments_file, csv_path):
+        """
+        返回 (sentiment_count, keyword_counts, 评论总数, 实际推理的条数)
+        keyword_counts 为各评论关键词的精确出现次数，同时用于主题词和可合并的词频文件
+        CSV 先写到临时文件，全部完成后再替换，中途出错不会留下不完整的结果
+        """
+        self.segment_store = SegmentStore()
+        prepared_q = queue.Queue(self.queue_size)
+        block_q = queue.Queue(self.queue_size)
+        result_q = queue.Queue(self.queue_size)
+        self._run_stage(lambda _: iter_text_blocks(comments_file, self.block_size), None, block_q)
+        self._run_stage(self._prepare, self._drain(block_q), prepared_q)
+        self._run_stage(self._infer, self._drain(prepared_q), result_q)
+
+        sentiment_count = Counter()
+        keyword_counts = Counter()
+        total = inferred = 0
+        tmp_path = csv_path + '.tmp'
+        try:
+            # 与 DataFrame.to_csv(index=False, encoding="utf-8-sig") 的输出格式一致
+            with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f, lineterminator=os.linesep)
+                writer.writerow(CSV_COLUMNS)
+                for texts, results, n_inferred, keywords in self._drain(result_q):
+                    for text, (sentiment, score) in zip(texts, results):
+                        writer.writerow([text, sentiment, score])
+                        sentiment_count[sentiment] += 1
+                    f.flush()
+                    keyword_counts.update(keywords)
+                    total += len(texts)
+                    inferred += n_inferred
+            os.replace(tmp_path, csv_path)
+        finally:
+            self.stop.set()
+            self.segment_store.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return sentiment_count, keyword_counts, total, inferred
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DATA_ROOT = './data'
+SENTIMENT_FILE = 'comment_sentiment.csv'
+# comment_sentiment.csv 可能位于：分析时的输出目录、organize.py 整理后的目录，或电影目录本身
+SENTIMENT_SUBDIRS = ('原始评论数据', '情感分析结果', '')
+SUMMARY_CACHE_PATH = './cache/sentiment_summary.json'
+HIST_BINS = 20     # 正面概率直方图的区间数（0~1 等分）
+HASH_CHUNK = 1 << 20
+
+
+# ----------------- 单部电影 -----------------
+def find_sentiment_csv(movie_name, base_dir=DATA_ROOT):
+    """返回该电影最新的 comment_sentiment.csv 路径，没有时返回 None"""
+    paths = [os.path.join(base_dir, movie_name, sub, SENTIMENT_FILE) for sub in SENTIMENT_SUBDIRS]
+    paths = [path for path in paths if os.path.exists(path)]
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def summarize_csv(path):
+    """
+    读取一部电影的情感结果，返回条数、正负面计数与占比、平均置信度、平均正面概率和正面概率直方图；
+    正面概率 = 正面时的 score，负面时的 1 - score
+    """
+    try:
+        df = pd.read_csv(path, encoding='utf-8-sig', usecols=['sentiment', 'score'])
+    except pd.errors.EmptyDataError:
+        df = pd.DataFrame({'sentiment': [], 'score': []})
+    positive_mask = (df['sentiment'] == 'positive').to_numpy()
+    scores = pd.to_numeric(df['score'], errors='coerce').to_numpy(dtype=np.float64)
+    p_pos = np.where(positive_mask, scores, 1 - scores)
+    valid = ~np.isnan(p_pos)
+
+    total = len(df)
+    positive = int(positive_mask.sum())
+    negative = total - positive
+    hist, _ = np.histogram(p_pos[valid], bins=HIST_BINS, range=(0.0, 1.0))
+    return {
+        "total": total,
+        "positive": positive,
+        "negative": negative,
+        "pos_pct": round(positive / total * 100, 2) if total else None,
+        "neg_pct": round(negative / total * 100, 2) if total else None,
+        "mean_score": round(float(scores[valid].mean()), 4) if valid.any() else None,
+        "mean_positive_prob": round(float(p_pos[valid].mean()), 4) if valid.any() else None,
+        "histogram": hist.tolist(),
+    }
+
+
+# ----------------- 增量汇总 -----------------
+class SummaryCache:
+    """
+    每部电影的汇总结果按源文件缓存在 cache/sentiment_summary.json：
+    大小和修改时间都没变时直接使用；只有修改时间变了（例如文件被整理移动、重新写入了相同内容）
+    时再比较内容哈希，哈希也相同就不必重新读取 CSV
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("bins") == HIST_BINS:
+                self.entries = cached.get("movies", {})
+
+    def get(self, movie_name, csv_path):
+        """返回 (汇总结果, 是否重新读取了 CSV)"""
+        stat = os.stat(csv_path)
+        entry = self.entries.get(movie_name)
+        if entry and entry["size"] == stat.st_size:
+            if entry["mtime_ns"] == stat.st_mtime_ns:
+                return entry["summary"], False
+            digest = file_hash(csv_path)
+            if entry["sha1"] == digest:
+                entry.update(path=csv_path, mtime_ns=stat.st_mtime_ns)
+                self.dirty = True
+                return entry["summary"], False
+        else:
+            digest = file_hash(csv_path)
+
+        summary = summarize_csv(csv_path)
+        self.entries[movie_name] = {
+            "path": csv_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha1": digest,
+            "summary": summary,
+        }
+        self.dirty = True
+        return summary, True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"bins": HIST_BINS, "movies": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def load_summaries(base_dir=DATA_ROOT, cache_path=SUMMARY_CACHE_PATH):
+    """
+    返回 ({movie_name: 汇总结果}, 重新读取的电影列表)；没有情感结果或结果为空的电影不包含在内
+    """
+    summaries = {}
+    refreshed = []
+    if not os.path.exists(base_dir):
+        return summaries, refreshed
+    cache = SummaryCache(cache_path)
+    for movie in sorted(os.listdir(base_dir)):
+        csv_path = find_sentiment_csv(movie, base_dir)
+        if csv_path is None:
+            continue
+        summary, fresh = cache.get(movie, csv_path)
+        if fresh:
+            refreshed.append(movie)
+        if summary["total"]:
+            summaries[movie] = summary
+    cache.save()
+    return summaries, refreshed
+
+
+def spectrum_table(summaries):
+    """按正面占比从高到低排序的汇总表（正面占比相同时负面概率更低的在前，再按片名）"""
+    rows = [{"movie": movie, **{k: v for k, v in s.items() if k != "histogram"}}
+            for movie, s in summaries.items()]
+    df = pd.DataFrame(rows, columns=["movie", "total", "positive", "negative", "pos_pct", "neg_pct",
+                                     "mean_score", "mean_positive_prob"])
+    return df.sort_values(["pos_pct", "mean_positive_prob", "movie"], ascending=[False, False, True],
+                          kind="stable").reset_index(drop=True)
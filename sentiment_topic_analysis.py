@@ -1,12 +1,17 @@
 import json
 import os
 import jieba
-import jieba.analyse
 import pandas as pd
-import matplotlib.pyplot as plt
-from transformers import pipeline
 from collections import Counter
 from pathlib import Path  # 用于跨平台路径处理
+from sentiment_inference import (BACKENDS, DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, WINDOW_TOKENS, WINDOW_OVERLAP,
+                                 get_classifier, classify_cached)
+from inference_worker import connect_worker
+from keyword_engine import KeywordEngine, load_corpus, topic_keywords
+from segment_cache import segment_texts
+from sentiment_store import SentimentStore
+from sentiment_stream import SentimentStream
+from term_counts import TERM_COUNTS_FILE, TermCounts, counts_version
 
 
 # ----------------- 辅助功能：日志记录 -----------------
@@ -18,17 +23,22 @@ def log_info(message, log_file):
 
 
 # ----------------- 评论合并功能 -----------------
-def merge_movie_comments():
-    # 输入验证（过滤空值和非法字符）
-    while True:
+def merge_movie_comments(movie_name=None):
+    # 输入验证（过滤空值和非法字符）；未传入电影名称时交互式输入
+    invalid_chars = r'\/:*?"<>|'
+    if movie_name is not None:
+        movie_name = movie_name.strip()
+        if not movie_name or any(char in invalid_chars for char in movie_name):
+            print(f"错误：电影名称不能为空，也不能包含这些字符：{invalid_chars}")
+            return None, None, None
+    while movie_name is None:
         movie_name = input("请输入电影名称：").strip()
-        invalid_chars = r'\/:*?"<>|'
         if not movie_name:
             print("错误：电影名称不能为空！")
+            movie_name = None
         elif any(char in invalid_chars for char in movie_name):
             print(f"错误：电影名称不能包含这些字符：{invalid_chars}")
-        else:
-            break
+            movie_name = None
 
     # 路径设置
     data_dir = Path("./data") / movie_name / "原始评论数据"
@@ -145,7 +155,20 @@ def merge_movie_comments():
 
 
 # ----------------- 情感与主题词分析功能 -----------------
-def analyze_comments(movie_name, comments_file, log_file):
+_keyword_engine = None
+
+
+def get_keyword_engine(stopwords):
+    """同一次运行中分析多部电影时共用一个关键词引擎，全部电影的语料只构造一次"""
+    global _keyword_engine
+    if _keyword_engine is None:
+        _keyword_engine = KeywordEngine(load_corpus(), stopwords)
+    return _keyword_engine
+
+
+def analyze_comments(movie_name, comments_file, log_file, batch_size=DEFAULT_BATCH_SIZE,
+                     backend=DEFAULT_BACKEND, threads=None, chunking=None, use_worker=False, stream=False,
+                     keyword_mode="tfidf"):
     if not movie_name or not comments_file or not os.path.exists(comments_file) or not log_file:
         print("评论文件或日志文件不存在，无法进行分析")
         return
@@ -155,10 +178,6 @@ def analyze_comments(movie_name, comments_file, log_file):
     DATA_DIR = os.path.dirname(comments_file)
     STOPWORDS_FILE = "stopwords.txt"
 
-    # 读取评论
-    with open(comments_file, 'r', encoding='utf-8') as f:
-        comments = json.load(f)
-
     # 读取停用词
     try:
         with open(STOPWORDS_FILE, 'r', encoding='utf-8') as f:
@@ -168,81 +187,133 @@ def analyze_comments(movie_name, comments_file, log_file):
         log_info(f"警告：未找到停用词文件 {STOPWORDS_FILE}，将不使用停用词过滤", log_file)
         stopwords = set()
 
-    # 加载模型
     import time
-    start_time = time.time()
-    classifier = pipeline(
-        "sentiment-analysis",
-        model="IDEA-CCNL/Erlangshen-Roberta-330M-Sentiment"
-    )
-    load_time = time.time() - start_time
-    log_info(f"Loading model cost {load_time:.6f} seconds.", log_file)
-
-    jieba.initialize()
-    log_info("Prefix dict has been built succesfully.", log_file)
+    # 常驻推理服务已经加载好模型和 jieba 词典，连不上时退回进程内
+    worker = None
+    if use_worker:
+        worker = connect_worker(backend)
+        if worker is None:
+            log_info("未连接到推理服务（python inference_worker.py），改为进程内推理", log_file)
+        else:
+            log_info("已连接推理服务，模型与分词在服务进程中运行", log_file)
+    if worker is None or stream:
+        jieba.initialize()
+        log_info("Prefix dict has been built succesfully.", log_file)
 
     # -------- 情感分析 ---------
-    sentiment_list = []
-    sentiment_count = Counter()
-
-    for comment in comments:
-        text = comment.get("content", "").strip()
-        if not text:
-            continue
-
-        result = classifier(text[:128])[0]
-        label = result["label"].lower()
-        score = result["score"]
-        sentiment = "positive" if label == "positive" else "negative"
-
-        sentiment_list.append({
-            "content": text,
-            "sentiment": sentiment,
-            "score": score
-        })
-        sentiment_count[sentiment] += 1
-
-    # 保存情感结果
-    df_sentiment = pd.DataFrame(sentiment_list)
+    def load_classifier():
+        # 只有存在未缓存的评论时才加载模型
+        start_time = time.time()
+        classifier = get_classifier(backend, threads)
+        load_time = time.time() - start_time
+        log_info(f"Loading model ({backend}) cost {load_time:.6f} seconds.", log_file)
+        return classifier
+
+    # 已分类过的评论直接取缓存结果，其余按 token 长度分批推理，结果按原顺序返回
+    # chunking 为 (窗口长度, 重叠长度) 时对长评全文分窗推理，否则只取前 MAX_CHARS 个字符
     csv_path = os.path.join(DATA_DIR, "comment_sentiment.csv")
-    df_sentiment.to_csv(csv_path, index=False, encoding="utf-8-sig")
+    store = SentimentStore()
+    infer_start = time.time()
+    if stream:
+        # 流式模式：边读边推理边写 CSV，关键词提取也在流水线中完成，内存占用与评论数量无关
+        try:
+            sentiment_count, keyword_counter, total_comments, inferred = SentimentStream(
+                store, load_classifier, batch_size, backend, chunking, worker, stopwords
+            ).run(comments_file, csv_path)
+        finally:
+            store.close()
+            if worker is not None:
+                worker.close()
+        keyword_counts = pd.Series(keyword_counter, dtype="int64").sort_values(ascending=False, kind="stable")
+        term_counts = TermCounts.from_counter(keyword_counter, total_comments, counts_version(stopwords))
+    else:
+        # 读取评论
+        with open(comments_file, 'r', encoding='utf-8') as f:
+            comments = json.load(f)
+        texts = [comment.get("content", "").strip() for comment in comments]
+        texts = [text for text in texts if text]
+        try:
+            results, inferred = classify_cached(texts, store, load_classifier, batch_size,
+                                                backend=backend, chunking=chunking, remote=worker)
+        finally:
+            store.close()
+        total_comments = len(texts)
+
+        sentiment_list = []
+        sentiment_count = Counter()
+        for text, (sentiment, score) in zip(texts, results):
+            sentiment_list.append({
+                "content": text,
+                "sentiment": sentiment,
+                "score": score
+            })
+            sentiment_count[sentiment] += 1
+
+        # 保存情感结果
+        df_sentiment = pd.DataFrame(sentiment_list)
+        df_sentiment.to_csv(csv_path, index=False, encoding="utf-8-sig")
+
+    infer_time = time.time() - infer_start
+    if total_comments:
+        log_info(f"情感结果缓存命中 {total_comments - inferred} 条，需推理 {inferred} 条", log_file)
+        log_info(f"情感分析 {total_comments} 条，批大小 {batch_size}，耗时 {infer_time:.2f} 秒，"
+                 f"吞吐 {total_comments / max(infer_time, 1e-9):.1f} 条/秒", log_file)
     log_info(f"\n情感分析结果 CSV 已保存：{csv_path}", log_file)
 
-    total_comments = len(sentiment_list)
     for k, v in sentiment_count.items():
         log_info(f"{k} 评论: {v} 条，占比 {v / total_comments:.2%}", log_file)
 
+    # -------- 分词与精确词频 ---------
+    if not stream:
+        # 分词结果按内容哈希缓存，与词云、汇总分析共用，同一条评论只分词一次
+        if worker is not None:
+            segments = segment_texts(texts, compute=worker.segment)
+            worker.close()
+        else:
+            segments = segment_texts(texts)
+        term_counts = TermCounts.from_tags((tags for _, tags in segments), stopwords)
+
+    # 保存各评论关键词的可合并精确计数，overall.py 直接合并各电影的计数文件，不再重新分词
+    term_counts_path = os.path.join(DATA_DIR, TERM_COUNTS_FILE)
+    term_counts.save(term_counts_path)
+    log_info(f"词频计数已保存：{term_counts_path}（{len(term_counts.vocab)} 个词，共 {term_counts.total} 次）", log_file)
+
     # -------- 主题词分析 ---------
+    if keyword_mode == "none":
+        log_info("\n跳过主题词分析（由 keyword_engine.py --topic-csv 统一生成）", log_file)
+        log_info("\n评论分析全部完成！", log_file)
+        return
+
     log_info("\n开始提取主题关键词...", log_file)
 
-    all_keywords = []
-    for comment in comments:
-        text = comment.get("content", "").strip()
-        if text:
-            kws = jieba.analyse.extract_tags(text, topK=20, withWeight=False)
+    if keyword_mode == "tfidf":
+        # 在全部电影的评论语料上拟合 IDF，用矩阵运算给本片的词打分
+        engine = get_keyword_engine(stopwords)
+        if movie_name in engine.movies:
+            keyword_counts = topic_keywords(engine, movie_name)
+            log_info(f"TF-IDF 关键词基于 {len(engine.movies)} 部电影的评论语料", log_file)
+        else:
+            log_info(f"警告：语料中没有《{movie_name}》，改用逐条关键词计数", log_file)
+            keyword_mode = "count"
+
+    if keyword_mode != "tfidf" and not stream:
+        all_keywords = []
+        for _, kws in segments:
             kws = [k for k in kws if k not in stopwords]
             all_keywords.extend(kws)
-
-    if all_keywords:
         keyword_counts = pd.Series(all_keywords).value_counts()
+
+    if len(keyword_counts):
         top_n = 30
         top_keywords = keyword_counts.head(top_n)
 
         csv_kw_path = os.path.join(DATA_DIR, "comment_keywords.csv")
-        top_keywords.to_csv(csv_kw_path, header=["count"], encoding="utf-8-sig")
+        top_keywords.to_csv(csv_kw_path, header=["score" if keyword_mode == "tfidf" else "count"],
+                            encoding="utf-8-sig")
         log_info(f"主题词频 CSV 已保存：{csv_kw_path}", log_file)
 
-        # 柱状图
-        plt.figure(figsize=(12, 6))
-        plt.bar(top_keywords.index, top_keywords.values, width=0.5, color=plt.cm.viridis(range(top_n)))
-        plt.xticks(rotation=45, ha='right', fontproperties='SimSun')
-        plt.ylabel("出现次数", fontproperties='SimSun')
-        plt.title(f"{movie_name} 评论主题词前{top_n}", fontproperties='SimSun')
-        plt.tight_layout()
-        chart_path = os.path.join(DATA_DIR, "comment_keywords.png")
-        plt.savefig(chart_path)
-        plt.close()
-        log_info(f"主题词柱状图已保存：{chart_path}", log_file)
+        # 柱状图由 render_farm.py 根据 comment_keywords.csv 渲染，不占用分析流程的时间
+        log_info(f"主题词柱状图请运行：python render_farm.py {movie_name}", log_file)
     else:
         log_info("未提取到有效关键词，无法生成主题词分析结果", log_file)
 
@@ -250,8 +321,32 @@ def analyze_comments(movie_name, comments_file, log_file):
 
 # ----------------- 主程序 -----------------
 if __name__ == "__main__":
-    # 1. 合并评论
-    movie_name, comments_file, log_file = merge_movie_comments()
+    import argparse
+    parser = argparse.ArgumentParser(description="评论合并与情感 / 主题词分析")
+    parser.add_argument("movies", nargs="*", help="电影名称（可传多个，不传则交互式输入）")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"情感模型每批推理的评论数（默认 {DEFAULT_BATCH_SIZE}）")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="CPU 推理后端：fp32 原始模型 / int8 动态量化 / onnx（ONNX Runtime）")
+    parser.add_argument("--threads", type=int, help="推理线程数（默认由框架决定）")
+    parser.add_argument("--chunked", action="store_true",
+                        help="长文本分窗模式：按重叠的 token 窗口推理全文，而不是只取前 128 个字符")
+    parser.add_argument("--window", type=int, default=WINDOW_TOKENS, help=f"分窗长度（token，默认 {WINDOW_TOKENS}）")
+    parser.add_argument("--overlap", type=int, default=WINDOW_OVERLAP, help=f"窗口重叠（token，默认 {WINDOW_OVERLAP}）")
+    parser.add_argument("--worker", action="store_true",
+                        help="使用常驻推理服务（先运行 python inference_worker.py），连不上时退回进程内推理")
+    parser.add_argument("--stream", action="store_true",
+                        help="流式模式：边读边推理边写 CSV，内存占用不随评论数量增长")
+    parser.add_argument("--keywords", choices=["tfidf", "count", "none"], default="tfidf",
+                        help="主题词算法：tfidf（默认）为在本项目全部电影的评论语料上拟合 IDF 的矩阵打分，"
+                             "count 为原来的逐条 extract_tags 后计数，none 不生成主题词")
+    args = parser.parse_args()
+    chunking = (args.window, args.overlap) if args.chunked else None
+
+    # 1. 先合并所有电影的评论，TF-IDF 主题词的语料里就已经包含本次传入的每一部
+    merged = [merge_movie_comments(name) for name in args.movies or [None]]
     # 2. 分析评论
-    if movie_name and comments_file and log_file:
-        analyze_comments(movie_name, comments_file, log_file)
\ No newline at end of file
+    for movie_name, comments_file, log_file in merged:
+        if movie_name and comments_file and log_file:
+            analyze_comments(movie_name, comments_file, log_file, args.batch_size, args.backend, args.threads,
+                             chunking, args.worker, args.stream, args.keywords)
\ No newline at end of file
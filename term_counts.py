@@ -0,0 +1,117 @@
+import hashlib
+import os
+from collections import Counter
+from operator import itemgetter
+
+import numpy as np
+
+from keyword_engine import DATA_ROOT, RAW_SUBDIR, load_comment_texts
+from segment_cache import dictionary_version, segment_texts
+
+TERM_COUNTS_FILE = 'term_counts.npz'
+COUNTS_KIND = 'tags'   # 统计的是每条评论的关键词（extract_tags 前 20 个），而不是全部分词结果
+
+
+def counts_version(stopwords):
+    """词典版本 + 停用词表 + 统计对象决定了计数结果，任何一项变化时旧文件需要重建"""
+    digest = hashlib.sha256('\n'.join(sorted(stopwords)).encode('utf-8')).hexdigest()[:16]
+    return f"{dictionary_version()}|stopwords={digest}|{COUNTS_KIND}"
+
+
+# ----------------- 词频计数 -----------------
+class TermCounts:
+    """
+    精确的词频统计：按字典序排列的词表 + 对应的出现次数数组，
+    多部电影的结果可以直接合并，不需要重新分词。
+    与原来的词云一样，统计的是每条评论的关键词（segment_texts 返回的 tags）
+    """
+
+    def __init__(self, vocab, counts, n_docs=0, version=''):
+        self.vocab = np.asarray(vocab, dtype=str)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.n_docs = n_docs
+        self.version = version
+
+    @classmethod
+    def from_tags(cls, tag_lists, stopwords=()):
+        counter = Counter()
+        n_docs = 0
+        for tags in tag_lists:
+            counter.update(w for w in tags if w not in stopwords)
+            n_docs += 1
+        return cls.from_counter(counter, n_docs, counts_version(stopwords))
+
+    @classmethod
+    def from_counter(cls, counter, n_docs=0, version=''):
+        vocab = sorted(counter)
+        return cls(vocab, [counter[w] for w in vocab], n_docs, version)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def to_dict(self):
+        return dict(zip(self.vocab.tolist(), self.counts.tolist()))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # np.savez 会自动补 .npz 后缀，先写到同目录的临时文件再替换
+        tmp_path = path + '.tmp.npz'
+        np.savez_compressed(tmp_path, vocab=self.vocab, counts=self.counts,
+                            n_docs=np.int64(self.n_docs), version=np.str_(self.version))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['vocab'], data['counts'], int(data['n_docs']), str(data['version']))
+
+    @classmethod
+    def merge(cls, parts):
+        """合并多份计数：拼接后按词表去重求和，开销只与词表大小有关"""
+        parts = list(parts)
+        if not parts:
+            return cls([], [])
+        vocab, inverse = np.unique(np.concatenate([p.vocab for p in parts]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([p.counts for p in parts]), minlength=len(vocab))
+        versions = {p.version for p in parts}
+        return cls(vocab, counts.astype(np.int64), sum(p.n_docs for p in parts),
+                   versions.pop() if len(versions) == 1 else '')
+
+
+# ----------------- 每部电影的计数文件 -----------------
+def term_counts_path(movie_name, base_dir=DATA_ROOT):
+    return os.path.join(base_dir, movie_name, RAW_SUBDIR, TERM_COUNTS_FILE)
+
+
+def load_or_build(movie_name, stopwords, base_dir=DATA_ROOT):
+    """
+    读取电影的词频文件；文件不存在或者词典 / 停用词已经变化时，
+    从 all_comments.json 重新统计（分词走共用缓存）并保存。没有评论数据时返回 None
+    """
+    path = term_counts_path(movie_name, base_dir)
+    version = counts_version(stopwords)
+    if os.path.exists(path):
+        counts = TermCounts.load(path)
+        if counts.version == version:
+            return counts
+
+    texts = load_comment_texts(os.path.join(base_dir, movie_name, RAW_SUBDIR, "all_comments.json"))
+    if texts is None:
+        return None
+    counts = TermCounts.from_tags((tags for _, tags in segment_texts(texts)), stopwords)
+    counts.save(path)
+    return counts
+
+
+# ----------------- 词云选词 -----------------
+def cloud_weights(frequencies, max_words):
+    """
+    与 WordCloud.generate_from_frequencies 选词和归一化的方式相同：取频率最高的 max_words 个词，
+    除以其中的最大值。分析阶段据此写出词频文件，词云图片交给 render_farm.py 单独渲染
+    """
+    top = sorted(frequencies.items(), key=itemgetter(1), reverse=True)[:max_words]
+    if not top:
+        return {}
+    max_frequency = float(top[0][1])
+    return {word: freq / max_frequency for word, freq in top}
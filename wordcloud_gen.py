@@ -1,5 +1,5 @@
 import json
-from filter import filter_mother_daughter
+from filter import DEFAULT_THEME, get_matcher
 from statistic import MovieReviewStatistic
 import os
 import pandas as pd
@@ -28,6 +28,16 @@ def load_json(path):
     return []
 
 
+def raw_path(movie_name, filename):
+    """
+    爬虫把原始数据写在电影目录下，organize.py 整理后移到“原始评论数据”子文件夹；
+    电影目录下没有时读取整理后的文件
+    """
+    path = f'./data/{movie_name}/{filename}'
+    organized = f'./data/{movie_name}/原始评论数据/{filename}'
+    return organized if not os.path.exists(path) and os.path.exists(organized) else path
+
+
 def load_csv(path, content_col):
     if os.path.exists(path):
         df = pd.read_csv(path)
@@ -37,8 +47,9 @@ def load_csv(path, content_col):
 
 
 # ----------------- 主逻辑 -----------------
-def main():
-    movie_name = input("请输入电影名称：").strip()
+def main(movie_name=None):
+    if movie_name is None:
+        movie_name = input("请输入电影名称：").strip()
 
     # 日志文件名称
     log_filename = f"./data/{movie_name}/{movie_name}_母女关系分析日志.txt"
@@ -48,10 +59,10 @@ def main():
     print("开始处理数据...\n")
 
     # 读取短评、长评、小红书
-    short_path = f'./data/{movie_name}/short_reviews.json'
-    long_path = f'./data/{movie_name}/long_reviews.json'
-    xhs_comment_path = f'./data/{movie_name}/xhs_comments.csv'
-    xhs_search_path = f'./data/{movie_name}/xhs_contents.csv'
+    short_path = raw_path(movie_name, 'short_reviews.json')
+    long_path = raw_path(movie_name, 'long_reviews.json')
+    xhs_comment_path = raw_path(movie_name, 'xhs_comments.csv')
+    xhs_search_path = raw_path(movie_name, 'xhs_contents.csv')
 
     short_comments = load_json(short_path)
     long_comments = load_json(long_path)
@@ -63,31 +74,50 @@ def main():
     print(f"小红书评论：{len(xhs_comments)} 条")
     print(f"小红书搜索内容：{len(xhs_search_contents)} 条\n")
 
-    # 母女关系过滤
-    filtered_short = filter_mother_daughter(short_comments)
-    filtered_long = filter_mother_daughter(long_comments)
-    filtered_xhs_comments = filter_mother_daughter(xhs_comments)
-    filtered_xhs_search = filter_mother_daughter(xhs_search_contents)
+    # 全部来源的评论合在一起只扫描一遍，同时判断 filter_rules.json 中的所有主题
+    sources = [
+        ("豆瓣短评", short_comments),
+        ("豆瓣长评", long_comments),
+        ("小红书评论", xhs_comments),
+        ("小红书搜索结果", xhs_search_contents),
+    ]
+    matcher = get_matcher()
+    tagged = matcher.match_comments([c for _, comments in sources for c in comments])
+    source_labels = [label for label, comments in sources for _ in comments]
+
+    counts = {theme.name: {label: 0 for label, _ in sources} for theme in matcher.themes}
+    for label, (_, matched) in zip(source_labels, tagged):
+        for theme_name in matched:
+            counts[theme_name][label] += 1
 
     print("-------- 母女关系相关评论统计 --------")
-    print(f"豆瓣短评相关：{len(filtered_short)}")
-    print(f"豆瓣长评相关：{len(filtered_long)}")
-    print(f"小红书评论相关：{len(filtered_xhs_comments)}")
-    print(f"小红书搜索结果相关：{len(filtered_xhs_search)}")
-
-    # 合并全部来源的评论
-    all_filtered_comments = (
-        filtered_short +
-        filtered_long +
-        filtered_xhs_comments +
-        filtered_xhs_search
-    )
+    for label, _ in sources:
+        print(f"{label}相关：{counts[DEFAULT_THEME][label]}")
+
+    # 合并全部来源的评论（顺序与来源顺序一致）
+    all_filtered_comments = [c for c, matched in tagged if DEFAULT_THEME in matched]
+    all_filtered_sources = [label for label, (_, matched) in zip(source_labels, tagged) if DEFAULT_THEME in matched]
 
     print(f"\n总的母女关系相关评论：{len(all_filtered_comments)}")
     print("--------------------------------------\n")
 
+    # 各主题在各来源中的相关评论数
+    theme_df = pd.DataFrame(
+        [[counts[theme.name][label] for label, _ in sources] for theme in matcher.themes],
+        index=[theme.label for theme in matcher.themes],
+        columns=[label for label, _ in sources],
+    )
+    theme_df["合计"] = theme_df.sum(axis=1)
+    theme_df.index.name = "主题"
+    print("-------- 各关系主题相关评论统计 --------")
+    print(theme_df.to_string())
+    theme_path = f"./data/{movie_name}/theme_counts.csv"
+    theme_df.to_csv(theme_path, encoding="utf-8-sig")
+    print(f"已保存：{theme_path}")
+    print("--------------------------------------\n")
+
     # 调用统计模块
-    stat = MovieReviewStatistic(movie_name, all_filtered_comments)
+    stat = MovieReviewStatistic(movie_name, all_filtered_comments, all_filtered_sources)
     stat.stastic_star()
     stat.statistic_comment()
 
@@ -95,4 +125,5 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    # 可直接传入电影名称：python wordcloud_gen.py 女孩
+    main(sys.argv[1] if len(sys.argv) > 1 else None)